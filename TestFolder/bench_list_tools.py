@@ -0,0 +1,86 @@
+"""
+Per-request cost of answering tools/list.
+
+Compares two ways of serving the tool list through Server.list_tools(),
+each including the JSON serialization the MCP session does before sending
+the response:
+- rebuild: every Tool and its schema built again per request (the old server.py)
+- prebuilt: the module-level server.TOOL_LIST returned as is (the current server.py)
+
+Run from the repository root: python TestFolder/bench_list_tools.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp.types as types
+from mcp.server.lowlevel import Server
+
+import server
+
+REQUESTS = 2000
+
+
+def make_rebuild_app() -> Server:
+    app = Server("bench-rebuild")
+    definitions = [spec.tool.model_dump() for spec in server.TOOL_REGISTRY.values()]
+
+    @app.list_tools()
+    async def list_tools():
+        return [
+            types.Tool(
+                name=tool["name"],
+                description=tool["description"],
+                inputSchema={key: value for key, value in tool["inputSchema"].items()}
+            )
+            for tool in definitions
+        ]
+
+    return app
+
+
+def make_prebuilt_app() -> Server:
+    app = Server("bench-prebuilt")
+
+    @app.list_tools()
+    async def list_tools():
+        return server.TOOL_LIST
+
+    return app
+
+
+async def bench(name: str, app: Server) -> None:
+    handler = app.request_handlers[types.ListToolsRequest]
+    request = types.ListToolsRequest(method="tools/list")
+
+    await handler(request)
+
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        result = await handler(request)
+    handler_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        result = await handler(request)
+        result.model_dump_json(by_alias=True, exclude_none=True)
+    total_seconds = time.perf_counter() - started
+
+    print(
+        f"{name:<10} {len(result.root.tools):>3} tools  "
+        f"handler {handler_seconds / REQUESTS * 1e6:8.1f} us/request  "
+        f"with serialization {total_seconds / REQUESTS * 1e6:8.1f} us/request"
+    )
+
+
+async def main():
+    print(f"tools/list, {REQUESTS} requests each")
+    await bench("rebuild", make_rebuild_app())
+    await bench("prebuilt", make_prebuilt_app())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
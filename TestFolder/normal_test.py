@@ -27,6 +27,9 @@ from tools import (
     onedrive_search_folder_by_name,
     onedrive_get_item_by_id,
 
+    # Batch
+    onedrive_batch_get_items,
+
     #Sharing
     onedrive_list_shared_items,
     onedrive_create_share_link
@@ -222,6 +225,14 @@ if __name__ == "__main__":
     else:
         print("No saved files to create share link")
 
+    print("\n---- TEST 18: onedrive_batch_get_items (all saved files and folders) ----")
+    batch_ids = [item['id'] for item in saved_files + saved_folders]
+    if batch_ids:
+        res18 = asyncio.run(onedrive_batch_get_items(batch_ids))
+        print("Result:", res18)
+    else:
+        print("No saved items to batch get")
+
     print("\n---- ALL TESTS DONE ----")
     print("Final saved folders:", saved_folders)
     print("Final saved files:", saved_files)
@@ -1,9 +1,8 @@
 import contextlib
 import logging
 import os
-import json
 from collections.abc import AsyncIterator
-from typing import Any, Dict, List
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, NamedTuple
 import asyncio
 
 import click
@@ -20,6 +19,11 @@ from dotenv import load_dotenv
 from tools import (
     # Base
     auth_token_context,
+    close_onedrive_clients,
+    close_mirrors,
+    log_request_metrics,
+    log_cache_stats,
+    serialize_result,
 
     # Both Items (Files & Folders)
     onedrive_rename_item,
@@ -28,6 +32,8 @@ from tools import (
 
     # Files
     onedrive_read_file_content,
+    onedrive_read_file_content_by_path,
+    onedrive_download_file,
     onedrive_overwrite_file_by_id,
     onedrive_create_file,
     onedrive_create_file_in_root,
@@ -42,6 +48,21 @@ from tools import (
     onedrive_search_item_by_name,
     onedrive_search_folder_by_name,
     onedrive_get_item_by_id,
+    onedrive_get_item_by_path,
+    onedrive_list_folder_by_path,
+
+    # Tree
+    onedrive_walk_tree,
+    onedrive_folder_stats,
+
+    # Bulk upload
+    onedrive_upload_directory,
+
+    # Batch
+    onedrive_batch_get_items,
+    onedrive_batch_delete_items,
+    onedrive_batch_move_items,
+    onedrive_batch_rename_items,
 
     #Sharing
     onedrive_list_shared_items,
@@ -56,6 +77,492 @@ load_dotenv()
 
 ONEDRIVE_MCP_SERVER_PORT = int(os.getenv("ONEDRIVE_MCP_SERVER_PORT", "5000"))
 
+#-------------------------------------------------------------------------------------
+# Tool registry
+
+# Turns a tool result into response text: (result, compact_items) -> str
+Encoder = Callable[[Any, bool], str]
+
+def encode_json(result: Any, compact_items: bool = True) -> str:
+    """compact_items=False keeps every driveItem field (a tool asked for "full" or explicit fields)."""
+    return serialize_result(result) if compact_items else serialize_result(result, compact=False)
+
+def encode_content(result: Any, compact_items: bool = True) -> str:
+    """File content tools return plain text as-is and everything else as JSON."""
+    return result if isinstance(result, str) else encode_json(result, compact_items)
+
+def encode_message(result: Any, compact_items: bool = True) -> str:
+    """Tools that return a one-message tuple, e.g. ("Item X deleted.",), send just the message."""
+    if isinstance(result, tuple) and len(result) == 1 and isinstance(result[0], str):
+        return result[0]
+    return encode_json(result, compact_items)
+
+
+class ToolSpec(NamedTuple):
+    tool: types.Tool
+    handler: Callable[..., Awaitable[Any]]
+    encode: Encoder
+    parameters: FrozenSet[str]
+
+
+# Field projection accepted by the metadata and listing tools (sent to Graph as $select)
+FIELDS_PROPERTY = {
+    "type": "string",
+    "description": "Fields to return per item: 'compact' (default: id, name, size, dates, webUrl, parent, file/folder facets), 'full', or a comma-separated list of driveItem fields (optional)"
+}
+
+def wants_compact_items(arguments: Dict[str, Any]) -> bool:
+    return (arguments.get("fields") or "compact").strip().lower() == "compact"
+
+
+# tool name -> spec, in the order tools are listed
+TOOL_REGISTRY: Dict[str, ToolSpec] = {}
+
+def register_tool(
+        handler: Callable[..., Awaitable[Any]],
+        description: str,
+        input_schema: Dict[str, Any],
+        encode: Encoder = encode_json
+) -> None:
+    """
+    Register an onedrive_* coroutine as an MCP tool named after the function.
+
+    Arguments are passed to the handler as keyword arguments, so schema
+    property names must match its parameter names.
+    """
+    name = handler.__name__
+    TOOL_REGISTRY[name] = ToolSpec(
+        tool=types.Tool(name=name, description=description, inputSchema=input_schema),
+        handler=handler,
+        encode=encode,
+        parameters=frozenset(input_schema.get("properties", {}))
+    )
+
+# File Operations
+register_tool(
+    onedrive_rename_item,
+    "Rename a file or folder in OneDrive by its ID.",
+    {
+        "type": "object",
+        "properties": {
+            "file_id": {"type": "string", "description": "ID of the file/folder to rename"},
+            "new_name": {"type": "string", "description": "New name for the item"}
+        },
+        "required": ["file_id", "new_name"]
+    }
+)
+
+register_tool(
+    onedrive_move_item,
+    "Move an item to a different folder in OneDrive.",
+    {
+        "type": "object",
+        "properties": {
+            "item_id": {"type": "string", "description": "ID of the item to move"},
+            "new_parent_id": {"type": "string", "description": "ID of the destination folder"}
+        },
+        "required": ["item_id", "new_parent_id"]
+    }
+)
+
+register_tool(
+    onedrive_delete_item,
+    "Delete an item from OneDrive by its ID.",
+    {
+        "type": "object",
+        "properties": {
+            "item_id": {"type": "string", "description": "ID of the item to delete"}
+        },
+        "required": ["item_id"]
+    },
+    encode=encode_message
+)
+
+# File Content Operations
+register_tool(
+    onedrive_read_file_content,
+    "Read the content of a file from OneDrive by its ID. Supports byte ranges, bounded previews and saving to a local path.",
+    {
+        "type": "object",
+        "properties": {
+            "file_id": {"type": "string", "description": "ID of the file to read"},
+            "offset": {"type": "integer", "description": "First byte to read (optional)"},
+            "length": {"type": "integer", "description": "Number of bytes to read (optional, default to end of file)"},
+            "local_path": {"type": "string", "description": "Server file to write the content to instead of returning it, inside ONEDRIVE_LOCAL_ROOT (optional)"},
+            "max_bytes": {"type": "integer", "description": "Most bytes to return inline (optional)"}
+        },
+        "required": ["file_id"]
+    },
+    encode=encode_content
+)
+
+register_tool(
+    onedrive_read_file_content_by_path,
+    "Read the content of a file from OneDrive by its path (e.g. /Reports/2026/q3.csv). Supports byte ranges, bounded previews and saving to a local path.",
+    {
+        "type": "object",
+        "properties": {
+            "path": {"type": "string", "description": "Path of the file from the drive root"},
+            "offset": {"type": "integer", "description": "First byte to read (optional)"},
+            "length": {"type": "integer", "description": "Number of bytes to read (optional, default to end of file)"},
+            "local_path": {"type": "string", "description": "Server file to write the content to instead of returning it, inside ONEDRIVE_LOCAL_ROOT (optional)"},
+            "max_bytes": {"type": "integer", "description": "Most bytes to return inline (optional)"}
+        },
+        "required": ["path"]
+    },
+    encode=encode_content
+)
+
+register_tool(
+    onedrive_download_file,
+    "Download a file from OneDrive to a local path on the server. Large files are fetched as parallel byte ranges.",
+    {
+        "type": "object",
+        "properties": {
+            "file_id": {"type": "string", "description": "ID of the file to download"},
+            "local_path": {"type": "string", "description": "Server file to write, inside ONEDRIVE_LOCAL_ROOT"},
+            "range_size": {"type": "integer", "description": "Bytes per range (optional)"},
+            "max_concurrency": {"type": "integer", "description": "Ranges downloaded at once (optional)"}
+        },
+        "required": ["file_id", "local_path"]
+    }
+)
+
+register_tool(
+    onedrive_overwrite_file_by_id,
+    "Overwrite the content of an existing file in OneDrive.",
+    {
+        "type": "object",
+        "properties": {
+            "file_id": {"type": "string", "description": "ID of the file to overwrite"},
+            "new_content": {"type": "string", "description": "New content for the file"},
+            "source_path": {"type": "string", "description": "Server file to upload instead of new_content, inside ONEDRIVE_LOCAL_ROOT (optional)"}
+        },
+        "required": ["file_id"]
+    }
+)
+
+# File Creation
+register_tool(
+    onedrive_create_file,
+    "Create a new file in a specific OneDrive folder.",
+    {
+        "type": "object",
+        "properties": {
+            "parent_folder_id": {"type": "string", "description": "ID of the parent folder"},
+            "new_file_name": {"type": "string", "description": "Name for the new file"},
+            "data": {"type": "string", "description": "Content for the new file (optional)"},
+            "source_path": {"type": "string", "description": "Server file to upload instead of data, inside ONEDRIVE_LOCAL_ROOT (optional)"},
+            "if_exists": {"type": "string", "enum": ["error", "rename", "replace"], "default": "error", "description": "Behavior when file exists: 'error' (abort), 'rename' (create unique name), 'replace' (overwrite)"}
+        },
+        "required": ["parent_folder_id", "new_file_name"]
+    }
+)
+
+register_tool(
+    onedrive_create_file_in_root,
+    "Create a new file in the root of OneDrive.",
+    {
+        "type": "object",
+        "properties": {
+            "new_file_name": {"type": "string", "description": "Name for the new file"},
+            "data": {"type": "string", "description": "Content for the new file (optional)"},
+            "source_path": {"type": "string", "description": "Server file to upload instead of data, inside ONEDRIVE_LOCAL_ROOT (optional)"},
+            "if_exists": {"type": "string", "enum": ["error", "rename", "replace"], "default": "error", "description": "Behavior when file exists: 'error' (abort), 'rename' (create unique name), 'replace' (overwrite)"}
+        },
+        "required": ["new_file_name"]
+    }
+)
+
+# Folder Operations
+register_tool(
+    onedrive_create_folder,
+    "Create a new folder in a specific OneDrive parent folder.",
+    {
+        "type": "object",
+        "properties": {
+            "parent_folder_id": {"type": "string", "description": "ID of the parent folder"},
+            "new_folder_name": {"type": "string", "description": "Name for the new folder"},
+            "behavior": {"type": "string", "enum": ["fail", "replace", "rename"], "default": "fail", "description": "Conflict resolution: 'fail' (return error), 'replace' (overwrite), 'rename' (unique name)"}
+        },
+        "required": ["parent_folder_id", "new_folder_name"]
+    }
+)
+
+register_tool(
+    onedrive_create_folder_in_root,
+    "Create a new folder in the root of OneDrive.",
+    {
+        "type": "object",
+        "properties": {
+            "folder_name": {"type": "string", "description": "Name for the new folder"}
+        },
+        "required": ["folder_name"]
+    }
+)
+
+# Listing & Searching
+register_tool(
+    onedrive_list_root_files_folders,
+    "List all files and folders in the root of OneDrive.",
+    {
+        "type": "object",
+        "properties": {
+            "top": {"type": "integer", "description": "Page size requested from Graph (optional)"},
+            "max_items": {"type": "integer", "description": "Maximum number of items to return (optional, default all)"},
+            "fields": FIELDS_PROPERTY
+        }
+    }
+)
+
+register_tool(
+    onedrive_list_inside_folder,
+    "List all items inside a specific folder.",
+    {
+        "type": "object",
+        "properties": {
+            "folder_id": {"type": "string", "description": "ID of the folder to list"},
+            "top": {"type": "integer", "description": "Page size requested from Graph (optional)"},
+            "max_items": {"type": "integer", "description": "Maximum number of items to return (optional, default all)"},
+            "fields": FIELDS_PROPERTY
+        },
+        "required": ["folder_id"]
+    }
+)
+
+register_tool(
+    onedrive_search_item_by_name,
+    "Search for items by name in OneDrive.",
+    {
+        "type": "object",
+        "properties": {
+            "itemname": {"type": "string", "description": "Name or partial name to search for"},
+            "top": {"type": "integer", "description": "Page size requested from Graph (optional)"},
+            "max_items": {"type": "integer", "description": "Maximum number of items to return (optional, default all)"},
+            "fields": FIELDS_PROPERTY
+        },
+        "required": ["itemname"]
+    }
+)
+
+register_tool(
+    onedrive_search_folder_by_name,
+    "Search for folders by name in OneDrive.",
+    {
+        "type": "object",
+        "properties": {
+            "folder_name": {"type": "string", "description": "Name or partial name to search for"},
+            "top": {"type": "integer", "description": "Page size requested from Graph (optional)"},
+            "max_items": {"type": "integer", "description": "Maximum number of items to return (optional, default all)"},
+            "fields": FIELDS_PROPERTY
+        },
+        "required": ["folder_name"]
+    }
+)
+
+register_tool(
+    onedrive_get_item_by_id,
+    "Get item details by its ID.",
+    {
+        "type": "object",
+        "properties": {
+            "item_id": {"type": "string", "description": "ID of the item to retrieve"},
+            "fields": FIELDS_PROPERTY
+        },
+        "required": ["item_id"]
+    }
+)
+
+register_tool(
+    onedrive_get_item_by_path,
+    "Get item details by its path from the drive root (e.g. /Reports/2026/q3.csv).",
+    {
+        "type": "object",
+        "properties": {
+            "path": {"type": "string", "description": "Path of the item from the drive root"},
+            "fields": FIELDS_PROPERTY
+        },
+        "required": ["path"]
+    }
+)
+
+register_tool(
+    onedrive_list_folder_by_path,
+    "List all items inside a folder given by its path from the drive root (\"/\" for the root).",
+    {
+        "type": "object",
+        "properties": {
+            "path": {"type": "string", "description": "Path of the folder from the drive root"},
+            "top": {"type": "integer", "description": "Page size requested from Graph (optional)"},
+            "max_items": {"type": "integer", "description": "Maximum number of items to return (optional, default all)"},
+            "fields": FIELDS_PROPERTY
+        },
+        "required": ["path"]
+    }
+)
+
+# Tree Operations
+register_tool(
+    onedrive_walk_tree,
+    "List every file and folder below a folder (breadth-first, several folders listed at once). Walks the whole drive when no folder is given.",
+    {
+        "type": "object",
+        "properties": {
+            "folder_id": {"type": "string", "description": "ID of the folder to walk (optional, default root)"},
+            "path": {"type": "string", "description": "Path of the folder to walk, used when folder_id is not given (optional)"},
+            "max_depth": {"type": "integer", "description": "Deepest level to list, 1 = direct children only (optional, default unlimited)"},
+            "files_only": {"type": "boolean", "default": False, "description": "Return only files"},
+            "folders_only": {"type": "boolean", "default": False, "description": "Return only folders"},
+            "name_contains": {"type": "string", "description": "Return only items whose name contains this text (optional)"},
+            "max_items": {"type": "integer", "description": "Stop after this many matching items (optional, default all)"},
+            "max_concurrency": {"type": "integer", "description": "Folder listings in flight at once (optional)"},
+            "fields": FIELDS_PROPERTY
+        }
+    }
+)
+
+register_tool(
+    onedrive_folder_stats,
+    "Summarize a folder: total size, file and folder counts, bytes per file type, and the largest files and subfolders.",
+    {
+        "type": "object",
+        "properties": {
+            "folder_id": {"type": "string", "description": "ID of the folder (optional, default root)"},
+            "path": {"type": "string", "description": "Path of the folder, used when folder_id is not given (optional)"},
+            "max_depth": {"type": "integer", "description": "Deepest level to walk, 1 = direct children only (optional, default unlimited)"},
+            "top_n": {"type": "integer", "default": 10, "description": "How many of the largest files and folders to return"},
+            "max_concurrency": {"type": "integer", "description": "Folder listings in flight at once (optional)"}
+        }
+    }
+)
+
+# Bulk Upload
+register_tool(
+    onedrive_upload_directory,
+    "Upload the contents of a local directory tree into a OneDrive folder, creating missing folders and skipping unchanged files.",
+    {
+        "type": "object",
+        "properties": {
+            "local_dir": {"type": "string", "description": "Server directory whose contents are uploaded, inside ONEDRIVE_LOCAL_ROOT"},
+            "parent_folder_id": {"type": "string", "description": "ID of the OneDrive folder to upload into (optional, default root)"},
+            "parent_path": {"type": "string", "description": "Path of the OneDrive folder, used when parent_folder_id is not given (optional)"},
+            "skip_unchanged": {"type": "boolean", "default": True, "description": "Skip files whose size and hash match the remote file"},
+            "max_concurrency": {"type": "integer", "description": "Files uploaded at once (optional)"}
+        },
+        "required": ["local_dir"]
+    }
+)
+
+# Batch Operations
+register_tool(
+    onedrive_batch_get_items,
+    "Get details of many items in OneDrive at once (uses $batch, 20 items per request).",
+    {
+        "type": "object",
+        "properties": {
+            "item_ids": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "IDs of the items to retrieve"
+            }
+        },
+        "required": ["item_ids"]
+    }
+)
+
+register_tool(
+    onedrive_batch_delete_items,
+    "Delete many items from OneDrive at once (uses $batch, 20 items per request).",
+    {
+        "type": "object",
+        "properties": {
+            "item_ids": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "IDs of the items to delete"
+            }
+        },
+        "required": ["item_ids"]
+    }
+)
+
+register_tool(
+    onedrive_batch_move_items,
+    "Move many items into one folder at once (uses $batch, 20 items per request).",
+    {
+        "type": "object",
+        "properties": {
+            "item_ids": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "IDs of the items to move"
+            },
+            "new_parent_id": {"type": "string", "description": "ID of the destination folder"},
+            "ordered": {"type": "boolean", "default": False, "description": "Move items strictly in the given order"}
+        },
+        "required": ["item_ids", "new_parent_id"]
+    }
+)
+
+register_tool(
+    onedrive_batch_rename_items,
+    "Rename many items at once (uses $batch, 20 items per request).",
+    {
+        "type": "object",
+        "properties": {
+            "renames": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "item_id": {"type": "string", "description": "ID of the item to rename"},
+                        "new_name": {"type": "string", "description": "New name for the item"}
+                    },
+                    "required": ["item_id", "new_name"]
+                },
+                "description": "Items to rename with their new names"
+            },
+            "ordered": {"type": "boolean", "default": False, "description": "Rename items strictly in the given order (e.g. when swapping names)"}
+        },
+        "required": ["renames"]
+    }
+)
+
+# Sharing & Permissions
+register_tool(
+    onedrive_list_shared_items,
+    "List all items shared with the current user in OneDrive.",
+    {
+        "type": "object",
+        "properties": {
+            "top": {"type": "integer", "description": "Page size requested from Graph (optional)"},
+            "max_items": {"type": "integer", "description": "Maximum number of items to return (optional, default all)"}
+        }
+    }
+)
+
+register_tool(
+    onedrive_create_share_link,
+    "Create a sharing link for a OneDrive item.",
+    {
+        "type": "object",
+        "properties": {
+            "item_id": {"type": "string", "description": "ID of the item to share"},
+            "link_type": {"type": "string", "enum": ["view", "edit", "embed"], "default": "view", "description": "Link permissions: 'view' (read-only), 'edit' (read-write), 'embed' (embeddable)"},
+            "scope": {"type": "string", "enum": ["anonymous", "organization"], "default": "anonymous", "description": "Link audience: 'anonymous' (anyone), 'organization' (company only)"}
+        },
+        "required": ["item_id"]
+    }
+)
+
+#-------------------------------------------------------------------------------------
+# tools/list
+
+# Built once: the registry does not change after import, so tools/list
+# returns the same Tool objects instead of rebuilding them per request
+TOOL_LIST: List[types.Tool] = [spec.tool for spec in TOOL_REGISTRY.values()]
+
+
 @click.command()
 @click.option("--port", default=ONEDRIVE_MCP_SERVER_PORT, help="Port to listen on for HTTP")
 @click.option(
@@ -85,574 +592,37 @@ def main(
     app = Server("onedrive-mcp-server")
 #-------------------------------------------------------------------------------------
 
-
     @app.list_tools()
-    async def list_tools() -> list[types.Tool]:
-        return [
-            # File Operations
-            types.Tool(
-                name="onedrive_rename_item",
-                description="Rename a file or folder in OneDrive by its ID.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "file_id": {"type": "string", "description": "ID of the file/folder to rename"},
-                        "new_name": {"type": "string", "description": "New name for the item"}
-                    },
-                    "required": ["file_id", "new_name"]
-                }
-            ),
-            types.Tool(
-                name="onedrive_move_item",
-                description="Move an item to a different folder in OneDrive.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "item_id": {"type": "string", "description": "ID of the item to move"},
-                        "new_parent_id": {"type": "string", "description": "ID of the destination folder"}
-                    },
-                    "required": ["item_id", "new_parent_id"]
-                }
-            ),
-            types.Tool(
-                name="onedrive_delete_item",
-                description="Delete an item from OneDrive by its ID.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "item_id": {"type": "string", "description": "ID of the item to delete"}
-                    },
-                    "required": ["item_id"]
-                }
-            ),
-
-            # File Content Operations
-            types.Tool(
-                name="onedrive_read_file_content",
-                description="Read the content of a file from OneDrive by its ID.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "file_id": {"type": "string", "description": "ID of the file to read"}
-                    },
-                    "required": ["file_id"]
-                }
-            ),
-            types.Tool(
-                name="onedrive_overwrite_file_by_id",
-                description="Overwrite the content of an existing file in OneDrive.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "file_id": {"type": "string", "description": "ID of the file to overwrite"},
-                        "new_content": {"type": "string", "description": "New content for the file"}
-                    },
-                    "required": ["file_id", "new_content"]
-                }
-            ),
-
-            # File Creation
-            types.Tool(
-                name="onedrive_create_file",
-                description="Create a new file in a specific OneDrive folder.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "parent_folder_id": {"type": "string", "description": "ID of the parent folder"},
-                        "new_file_name": {"type": "string", "description": "Name for the new file"},
-                        "data": {"type": "string", "description": "Content for the new file (optional)"},
-                        "if_exists": {
-                            "type": "string",
-                            "enum": ["error", "rename", "replace"],
-                            "default": "error",
-                            "description": "Behavior when file exists: 'error' (abort), 'rename' (create unique name), 'replace' (overwrite)"
-                        }
-                    },
-                    "required": ["parent_folder_id", "new_file_name"]
-                }
-            ),
-            types.Tool(
-                name="onedrive_create_file_in_root",
-                description="Create a new file in the root of OneDrive.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "new_file_name": {"type": "string", "description": "Name for the new file"},
-                        "data": {"type": "string", "description": "Content for the new file (optional)"},
-                        "if_exists": {
-                            "type": "string",
-                            "enum": ["error", "rename", "replace"],
-                            "default": "error",
-                            "description": "Behavior when file exists: 'error' (abort), 'rename' (create unique name), 'replace' (overwrite)"
-                        }
-                    },
-                    "required": ["new_file_name"]
-                }
-            ),
-
-            # Folder Operations
-            types.Tool(
-                name="onedrive_create_folder",
-                description="Create a new folder in a specific OneDrive parent folder.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "parent_folder_id": {"type": "string", "description": "ID of the parent folder"},
-                        "new_folder_name": {"type": "string", "description": "Name for the new folder"},
-                        "behavior": {
-                            "type": "string",
-                            "enum": ["fail", "replace", "rename"],
-                            "default": "fail",
-                            "description": "Conflict resolution: 'fail' (return error), 'replace' (overwrite), 'rename' (unique name)"
-                        }
-                    },
-                    "required": ["parent_folder_id", "new_folder_name"]
-                }
-            ),
-            types.Tool(
-                name="onedrive_create_folder_in_root",
-                description="Create a new folder in the root of OneDrive.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "folder_name": {"type": "string", "description": "Name for the new folder"}
-                    },
-                    "required": ["folder_name"]
-                }
-            ),
-
-            # Listing & Searching
-            types.Tool(
-                name="onedrive_list_root_files_folders",
-                description="List all files and folders in the root of OneDrive.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {}
-                }
-            ),
-            types.Tool(
-                name="onedrive_list_inside_folder",
-                description="List all items inside a specific folder.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "folder_id": {"type": "string", "description": "ID of the folder to list"}
-                    },
-                    "required": ["folder_id"]
-                }
-            ),
-            types.Tool(
-                name="onedrive_search_item_by_name",
-                description="Search for items by name in OneDrive.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "itemname": {"type": "string", "description": "Name or partial name to search for"}
-                    },
-                    "required": ["itemname"]
-                }
-            ),
-            types.Tool(
-                name="onedrive_search_folder_by_name",
-                description="Search for folders by name in OneDrive.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "folder_name": {"type": "string", "description": "Name or partial name to search for"}
-                    },
-                    "required": ["folder_name"]
-                }
-            ),
-            types.Tool(
-                name="onedrive_get_item_by_id",
-                description="Get item details by its ID.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "item_id": {"type": "string", "description": "ID of the item to retrieve"}
-                    },
-                    "required": ["item_id"]
-                }
-            ),
-
-            # Sharing & Permissions
-            types.Tool(
-                name="onedrive_list_shared_items",
-                description="List all items shared with the current user in OneDrive.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {}
-                }
-            ),
-            types.Tool(
-                name="onedrive_create_share_link",
-                description="Create a sharing link for a OneDrive item.",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "item_id": {"type": "string", "description": "ID of the item to share"},
-                        "link_type": {
-                            "type": "string",
-                            "enum": ["view", "edit", "embed"],
-                            "default": "view",
-                            "description": "Link permissions: 'view' (read-only), 'edit' (read-write), 'embed' (embeddable)"
-                        },
-                        "scope": {
-                            "type": "string",
-                            "enum": ["anonymous", "organization"],
-                            "default": "anonymous",
-                            "description": "Link audience: 'anonymous' (anyone), 'organization' (company only)"
-                        }
-                    },
-                    "required": ["item_id"]
-                }
-            )
-        ]
+    async def list_tools() -> List[types.Tool]:
+        return TOOL_LIST
 
     @app.call_tool()
     async def call_tool(
             name: str, arguments: dict
     ) -> List[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-
-        # File Operations
-        if name == "onedrive_rename_item":
-            try:
-                result = onedrive_rename_item(
-                    file_id=arguments["file_id"],
-                    new_name=arguments["new_name"]
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error renaming item: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        elif name == "onedrive_move_item":
-            try:
-                result = onedrive_move_item(
-                    item_id=arguments["item_id"],
-                    new_parent_id=arguments["new_parent_id"]
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error moving item: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        elif name == "onedrive_delete_item":
-            try:
-                result = onedrive_delete_item(
-                    item_id=arguments["item_id"]
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=result,
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error deleting item: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        # File Content Operations
-        elif name == "onedrive_read_file_content":
-            try:
-                result = onedrive_read_file_content(
-                    file_id=arguments["file_id"]
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=result if isinstance(result, str) else json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error reading file content: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        elif name == "onedrive_overwrite_file_by_id":
-            try:
-                result = onedrive_overwrite_file_by_id(
-                    file_id=arguments["file_id"],
-                    new_content=arguments["new_content"]
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error overwriting file: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        # File Creation
-        elif name == "onedrive_create_file":
-            try:
-                result = onedrive_create_file(
-                    parent_folder_id=arguments["parent_folder_id"],
-                    new_file_name=arguments["new_file_name"],
-                    data=arguments.get("data"),
-                    if_exists=arguments.get("if_exists", "error")
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error creating file: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        elif name == "onedrive_create_file_in_root":
-            try:
-                result = onedrive_create_file_in_root(
-                    new_file_name=arguments["new_file_name"],
-                    data=arguments.get("data"),
-                    if_exists=arguments.get("if_exists", "error")
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error creating file in root: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        # Folder Operations
-        elif name == "onedrive_create_folder":
-            try:
-                result = onedrive_create_folder(
-                    parent_folder_id=arguments["parent_folder_id"],
-                    new_folder_name=arguments["new_folder_name"],
-                    behavior=arguments.get("behavior", "fail")
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error creating folder: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        elif name == "onedrive_create_folder_in_root":
-            try:
-                result = onedrive_create_folder_in_root(
-                    folder_name=arguments["folder_name"]
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error creating folder in root: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        # Listing & Searching
-        elif name == "onedrive_list_root_files_folders":
-            try:
-                result = onedrive_list_root_files_folders()
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error listing root items: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        elif name == "onedrive_list_inside_folder":
-            try:
-                result = onedrive_list_inside_folder(
-                    folder_id=arguments["folder_id"]
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error listing folder contents: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        elif name == "onedrive_search_item_by_name":
-            try:
-                result = onedrive_search_item_by_name(
-                    itemname=arguments["itemname"]
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error searching items: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        elif name == "onedrive_search_folder_by_name":
-            try:
-                result = onedrive_search_folder_by_name(
-                    folder_name=arguments["folder_name"]
-                )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error searching folders: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        elif name == "onedrive_get_item_by_id":
-            try:
-                result = onedrive_get_item_by_id(
-                    item_id=arguments["item_id"]
+        spec = TOOL_REGISTRY.get(name)
+        if spec is None:
+            return [
+                types.TextContent(
+                    type="text",
+                    text=f"Unknown OneDrive tool: {name}",
                 )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error getting item by ID: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        # Sharing & Permissions
-        elif name == "onedrive_list_shared_items":
-            try:
-                result = onedrive_list_shared_items()
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error listing shared items: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        elif name == "onedrive_create_share_link":
-            try:
-                result = onedrive_create_share_link(
-                    item_id=arguments["item_id"],
-                    link_type=arguments.get("link_type", "view"),
-                    scope=arguments.get("scope", "anonymous")
+            ]
+
+        try:
+            result = await spec.handler(**{k: v for k, v in arguments.items() if k in spec.parameters})
+            return [
+                types.TextContent(
+                    type="text",
+                    text=spec.encode(result, wants_compact_items(arguments)),
                 )
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=json.dumps(result, indent=2),
-                    )
-                ]
-            except Exception as e:
-                logger.exception(f"Error creating share link: {e}")
-                return [
-                    types.TextContent(
-                        type="text",
-                        text=f"Error: {str(e)}",
-                    )
-                ]
-
-        else:
+            ]
+        except Exception as e:
+            logger.exception(f"Error calling {name}: {e}")
             return [
                 types.TextContent(
                     type="text",
-                    text=f"Unknown OneDrive tool: {name}",
+                    text=f"Error: {str(e)}",
                 )
             ]
 
@@ -711,13 +681,17 @@ def main(
 
     @contextlib.asynccontextmanager
     async def lifespan(app: Starlette) -> AsyncIterator[None]:
-        """Context manager for session manager."""
+        """Context manager for session manager, the pooled Graph clients and drive mirrors."""
         async with session_manager.run():
             logger.info("Application started with dual transports!")
             try:
                 yield
             finally:
                 logger.info("Application shutting down...")
+                log_request_metrics()
+                log_cache_stats()
+                await close_onedrive_clients()
+                close_mirrors()
 
     # Create an ASGI application with routes for both transports
     starlette_app = Starlette(
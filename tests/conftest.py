@@ -0,0 +1,57 @@
+import asyncio
+from typing import Callable, List
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from tools import base
+from tools.base import OneDriveClient, TenantLimiter
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> List[float]:
+    """
+    Record retry and backoff delays instead of waiting for them.
+    """
+    delays: List[float] = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return delays
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """
+    Fresh request counters for one test.
+    """
+    counters = dict.fromkeys(base.request_metrics, 0)
+    monkeypatch.setattr(base, "request_metrics", counters)
+    return counters
+
+
+@pytest_asyncio.fixture
+async def make_client():
+    """
+    Build OneDriveClients whose requests are answered by a handler instead of the network.
+
+    Each client gets its own limiter with no rate limit in effect, so tests
+    do not share throttling state through the process-wide limiter registry.
+    """
+    clients: List[OneDriveClient] = []
+
+    def make(handler: Callable[[httpx.Request], httpx.Response]) -> OneDriveClient:
+        client = OneDriveClient("tok")
+        client.limiter = TenantLimiter(rate=1000, burst=1000, concurrency=16)
+        client.http = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.aclose()
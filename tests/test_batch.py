@@ -0,0 +1,117 @@
+import json
+
+import httpx
+import pytest
+
+from tools.batch import BATCH_MAX_REQUESTS, _chunk_requests, batch_request, graph_batch
+
+
+def ids(chunks):
+    return [[request["id"] for request in chunk] for chunk in chunks]
+
+
+def get(request_id, depends_on=None):
+    return batch_request(request_id, "GET", f"/me/drive/items/{request_id}", depends_on=depends_on)
+
+
+def test_independent_requests_fill_chunks_in_order():
+    requests = [get(str(i)) for i in range(BATCH_MAX_REQUESTS + 5)]
+
+    chunks = _chunk_requests(requests)
+
+    assert ids(chunks) == [
+        [str(i) for i in range(BATCH_MAX_REQUESTS)],
+        [str(i) for i in range(BATCH_MAX_REQUESTS, BATCH_MAX_REQUESTS + 5)]
+    ]
+
+
+def test_dependency_group_is_not_split_across_chunks():
+    requests = [get(str(i)) for i in range(BATCH_MAX_REQUESTS - 1)]
+    requests += [get("a"), get("b", depends_on=["a"])]
+
+    chunks = _chunk_requests(requests)
+
+    assert ids(chunks) == [[str(i) for i in range(BATCH_MAX_REQUESTS - 1)], ["a", "b"]]
+
+
+def test_transitive_dependencies_form_one_group():
+    requests = [get("a"), get("x"), get("b", depends_on=["a"]), get("y"), get("c", depends_on=["b"])]
+
+    chunks = _chunk_requests(requests)
+
+    assert len(chunks) == 1
+    group = ids(chunks)[0]
+    assert group.index("a") < group.index("b") < group.index("c")
+    assert sorted(group) == ["a", "b", "c", "x", "y"]
+
+
+def test_request_depending_on_two_groups_joins_them():
+    requests = [get("a"), get("b"), get("c", depends_on=["a", "b"])]
+    requests = [get(str(i)) for i in range(BATCH_MAX_REQUESTS - 2)] + requests
+
+    chunks = _chunk_requests(requests)
+
+    assert ids(chunks)[-1] == ["a", "b", "c"]
+    assert all(len(chunk) <= BATCH_MAX_REQUESTS for chunk in chunks)
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="unknown request"):
+        _chunk_requests([get("a", depends_on=["missing"])])
+
+
+def test_dependency_chain_longer_than_a_batch_is_rejected():
+    requests = [get("0")] + [get(str(i), depends_on=[str(i - 1)]) for i in range(1, BATCH_MAX_REQUESTS + 1)]
+
+    with pytest.raises(ValueError, match="exceeds the \\$batch limit"):
+        _chunk_requests(requests)
+
+
+@pytest.mark.asyncio
+async def test_throttled_sub_requests_are_resent_with_their_dependents(make_client, sleeps):
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        subs = json.loads(request.content)["requests"]
+        sent.append(subs)
+        if len(sent) == 1:
+            return httpx.Response(200, json={"responses": [
+                {"id": "a", "status": 429, "headers": {"Retry-After": "2"}},
+                {"id": "b", "status": 424},
+                {"id": "c", "status": 200, "body": {"id": "c"}}
+            ]})
+        return httpx.Response(200, json={"responses": [
+            {"id": sub["id"], "status": 200, "body": {"id": sub["id"]}} for sub in subs
+        ]})
+
+    client = make_client(handler)
+    requests = [get("a"), get("b", depends_on=["a"]), get("c")]
+
+    results = await graph_batch(client, requests)
+
+    assert {request_id: result["status"] for request_id, result in results.items()} == {"a": 200, "b": 200, "c": 200}
+    assert [sub["id"] for sub in sent[1]] == ["a", "b"]
+    assert sent[1][1]["dependsOn"] == ["a"]
+    assert sleeps == [2.0]
+    assert client.limiter.rate < client.limiter.max_rate
+
+
+@pytest.mark.asyncio
+async def test_ordered_batch_skips_later_chunks_after_a_failure(make_client):
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        subs = json.loads(request.content)["requests"]
+        sent.append(subs)
+        responses = [{"id": sub["id"], "status": 200} for sub in subs]
+        responses[-1]["status"] = 404
+        return httpx.Response(200, json={"responses": responses})
+
+    client = make_client(handler)
+    requests = [get(str(i)) for i in range(BATCH_MAX_REQUESTS + 3)]
+
+    results = await graph_batch(client, requests, ordered=True)
+
+    assert len(sent) == 1
+    assert all(sub["dependsOn"] == [str(i)] for i, sub in enumerate(sent[0][1:]))
+    assert [results[str(i)]["status"] for i in range(BATCH_MAX_REQUESTS, BATCH_MAX_REQUESTS + 3)] == [424] * 3
@@ -0,0 +1,144 @@
+import asyncio
+
+import httpx
+import pytest
+
+from tools.base import TenantLimiter
+
+URL = "https://graph.microsoft.com/v1.0/me/drive/root"
+
+
+def test_throttle_halves_rate_and_concurrency():
+    limiter = TenantLimiter(rate=40, burst=80, concurrency=16)
+
+    limiter.observe(429)
+
+    assert limiter.rate == 20
+    assert int(limiter.concurrency) == 8
+
+
+def test_burst_of_throttles_backs_off_once():
+    limiter = TenantLimiter(rate=40, burst=80, concurrency=16)
+
+    for _ in range(10):
+        limiter.observe(429)
+    assert limiter.rate == 20
+    assert int(limiter.concurrency) == 8
+
+    # A throttle more than a second after the last back-off is a new signal
+    limiter.last_backoff -= 1.0
+    limiter.observe(503)
+    assert limiter.rate == 10
+    assert int(limiter.concurrency) == 4
+
+
+def test_back_off_never_drops_below_one():
+    limiter = TenantLimiter(rate=4, burst=4, concurrency=2)
+
+    for _ in range(5):
+        limiter.last_backoff -= 1.0
+        limiter.observe(429)
+
+    assert limiter.rate == 1.0
+    assert limiter.concurrency == 1.0
+
+
+def test_success_recovers_up_to_the_ceiling():
+    limiter = TenantLimiter(rate=40, burst=80, concurrency=16)
+    limiter.observe(429)
+
+    limiter.observe(200)
+    assert 20 < limiter.rate < 40
+    assert 8 < limiter.concurrency < 16
+
+    for _ in range(500):
+        limiter.observe(200)
+    assert limiter.rate == 40
+    assert limiter.concurrency == 16
+
+
+def test_server_errors_do_not_adapt_limits():
+    limiter = TenantLimiter(rate=40, burst=80, concurrency=16)
+    limiter.observe(429)
+    rate, concurrency = limiter.rate, limiter.concurrency
+
+    limiter.observe(500)
+
+    assert (limiter.rate, limiter.concurrency) == (rate, concurrency)
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_a_slot():
+    limiter = TenantLimiter(rate=1000, burst=1000, concurrency=1)
+    await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    limiter.release()
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.in_use == 1
+
+    limiter.release()
+    assert limiter.is_idle
+
+
+@pytest.mark.asyncio
+async def test_reduced_concurrency_holds_back_waiters_until_recovery():
+    limiter = TenantLimiter(rate=1000, burst=1000, concurrency=2)
+    await limiter.acquire()
+    await limiter.acquire()
+    limiter.observe(429)
+    assert int(limiter.concurrency) == 1
+
+    waiter = asyncio.create_task(limiter.acquire())
+    limiter.release()
+    await asyncio.sleep(0)
+    # One request still holds the only slot left after the back-off
+    assert not waiter.done()
+
+    limiter.release()
+    await asyncio.wait_for(waiter, 1)
+    limiter.release()
+    assert limiter.is_idle
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    limiter = TenantLimiter(rate=1000, burst=1000, concurrency=1)
+    await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    limiter.release()
+    assert limiter.is_idle
+
+
+@pytest.mark.asyncio
+async def test_client_feeds_responses_to_the_limiter(make_client, sleeps):
+    statuses = iter([429, 200])
+    client = make_client(lambda request: httpx.Response(next(statuses), headers={"Retry-After": "0"}))
+    limiter = client.limiter
+
+    response = await client.get(URL)
+
+    assert response.status_code == 200
+    assert limiter.rate < limiter.max_rate
+    assert limiter.concurrency < limiter.max_concurrency
+    assert limiter.is_idle
+
+
+@pytest.mark.asyncio
+async def test_pre_authenticated_requests_bypass_the_limiter(make_client):
+    client = make_client(lambda request: httpx.Response(429, headers={"Retry-After": "0"}))
+    limiter = client.limiter
+
+    response = await client.get("https://upload.example.com/session", authenticated=False, retry=False)
+
+    assert response.status_code == 429
+    assert "Authorization" not in response.request.headers
+    assert limiter.rate == limiter.max_rate
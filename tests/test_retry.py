@@ -0,0 +1,174 @@
+import email.utils
+import time
+
+import httpx
+import pytest
+
+from tools import base
+from tools.base import backoff_delay, retry_after
+
+URL = "https://graph.microsoft.com/v1.0/me/drive/root"
+
+
+def responder(*outcomes):
+    """
+    Handler that returns (or raises) the given outcomes in order, repeating the last one.
+    """
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        outcome = outcomes[min(len(calls), len(outcomes)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return handler, calls
+
+
+@pytest.mark.asyncio
+async def test_throttled_request_waits_for_retry_after(make_client, sleeps, metrics):
+    handler, calls = responder(
+        httpx.Response(429, headers={"Retry-After": "3"}),
+        httpx.Response(503, headers={"Retry-After": "1"}),
+        httpx.Response(200, json={"id": "root"})
+    )
+    client = make_client(handler)
+
+    response = await client.get(URL)
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert sleeps == [3.0, 1.0]
+    assert metrics["throttled"] == 2
+    assert metrics["retries"] == 2
+    assert metrics["retry_wait_seconds"] == 4.0
+    assert metrics["gave_up"] == 0
+
+
+@pytest.mark.asyncio
+async def test_transient_error_uses_bounded_backoff(make_client, sleeps, monkeypatch):
+    monkeypatch.setattr(base, "RETRY_BASE_DELAY", 0.5)
+    handler, calls = responder(httpx.Response(502), httpx.Response(504), httpx.Response(200))
+    client = make_client(handler)
+
+    response = await client.get(URL)
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert 0 <= sleeps[0] <= 0.5
+    assert 0 <= sleeps[1] <= 1.0
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts(make_client, sleeps, metrics, monkeypatch):
+    monkeypatch.setattr(base, "RETRY_MAX_ATTEMPTS", 2)
+    handler, calls = responder(httpx.Response(500))
+    client = make_client(handler)
+
+    response = await client.get(URL)
+
+    assert response.status_code == 500
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+    assert metrics["gave_up"] == 1
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_server_error_is_not_retried(make_client, sleeps, metrics):
+    handler, calls = responder(httpx.Response(500), httpx.Response(201))
+    client = make_client(handler)
+
+    response = await client.post(URL, json={})
+
+    assert response.status_code == 500
+    assert len(calls) == 1
+    assert sleeps == []
+    assert metrics["gave_up"] == 0
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_throttled_request_is_retried(make_client, sleeps):
+    handler, calls = responder(httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(201))
+    client = make_client(handler)
+
+    response = await client.post(URL, json={})
+
+    assert response.status_code == 201
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_unsent_request_is_retried_for_any_method(make_client, sleeps, metrics):
+    handler, calls = responder(httpx.ConnectError("refused"), httpx.Response(201))
+    client = make_client(handler)
+
+    response = await client.post(URL, json={})
+
+    assert response.status_code == 201
+    assert len(calls) == 2
+    assert metrics["transport_errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sent_non_idempotent_request_is_not_resent(make_client, sleeps):
+    handler, calls = responder(httpx.ReadError("reset"), httpx.Response(201))
+    client = make_client(handler)
+
+    with pytest.raises(httpx.ReadError):
+        await client.post(URL, json={})
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_transport_error_gives_up_after_max_attempts(make_client, sleeps, metrics, monkeypatch):
+    monkeypatch.setattr(base, "RETRY_MAX_ATTEMPTS", 1)
+    handler, calls = responder(httpx.ReadError("reset"))
+    client = make_client(handler)
+
+    with pytest.raises(httpx.ReadError):
+        await client.get(URL)
+    assert len(calls) == 2
+    assert metrics["gave_up"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_disabled(make_client, sleeps, metrics):
+    handler, calls = responder(httpx.Response(503, headers={"Retry-After": "1"}), httpx.Response(200))
+    client = make_client(handler)
+
+    response = await client.get(URL, retry=False)
+
+    assert response.status_code == 503
+    assert len(calls) == 1
+    assert sleeps == []
+    assert metrics["gave_up"] == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_capped(make_client, sleeps, monkeypatch):
+    monkeypatch.setattr(base, "RETRY_MAX_DELAY", 5.0)
+    handler, _ = responder(httpx.Response(429, headers={"Retry-After": "120"}), httpx.Response(200))
+    client = make_client(handler)
+
+    await client.get(URL)
+
+    assert sleeps == [5.0]
+
+
+def test_retry_after_parses_seconds_and_dates():
+    assert retry_after(httpx.Response(429, headers={"Retry-After": "7"})) == 7.0
+    assert retry_after(httpx.Response(429, headers={"Retry-After": "-3"})) == 0.0
+    assert retry_after(httpx.Response(429)) is None
+    assert retry_after(httpx.Response(429, headers={"Retry-After": "soon"})) is None
+
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 28 <= retry_after(httpx.Response(503, headers={"Retry-After": date})) <= 30
+
+
+def test_backoff_delay_is_jittered_within_cap(monkeypatch):
+    monkeypatch.setattr(base, "RETRY_BASE_DELAY", 1.0)
+    monkeypatch.setattr(base, "RETRY_MAX_DELAY", 8.0)
+    for attempt in range(6):
+        for _ in range(20):
+            assert 0 <= backoff_delay(attempt) <= min(8.0, 2 ** attempt)
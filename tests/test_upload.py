@@ -0,0 +1,175 @@
+import os
+import re
+
+import httpx
+import pytest
+
+from tools import upload
+from tools.base import GraphError
+from tools.upload import FRAGMENT_UNIT, BytesSource, fragment_size, upload_in_session
+
+UPLOAD_URL = "https://upload.example.com/session/1"
+
+
+class FakeSession:
+    """
+    Upload session that stores fragments in memory and fails on request.
+
+    `failures` maps a fragment's start offset to what the next PUT at that
+    offset does instead of succeeding: an HTTP status to answer with, an
+    exception to raise before the fragment arrives, or ("after", status) to
+    store the fragment and still answer with the status, as when the
+    response is lost on the way back.
+    """
+
+    def __init__(self, total: int, failures=None):
+        self.total = total
+        self.received = bytearray()
+        self.failures = dict(failures or {})
+        self.puts = []
+        self.status_queries = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        assert "Authorization" not in request.headers
+        if request.method == "GET":
+            self.status_queries += 1
+            return httpx.Response(200, json={"nextExpectedRanges": [f"{len(self.received)}-"]})
+
+        start, end, total = map(int, re.match(r"bytes (\d+)-(\d+)/(\d+)", request.headers["Content-Range"]).groups())
+        self.puts.append(start)
+        assert total == self.total
+        assert end - start + 1 == len(request.content)
+
+        failure = self.failures.pop(start, None)
+        if isinstance(failure, Exception):
+            raise failure
+        if isinstance(failure, int):
+            return httpx.Response(failure)
+        if start != len(self.received):
+            return httpx.Response(416)
+        self.received += request.content
+        if isinstance(failure, tuple):
+            return httpx.Response(failure[1])
+        if len(self.received) == total:
+            return httpx.Response(201, json={"id": "item", "size": total})
+        return httpx.Response(202, json={"nextExpectedRanges": [f"{len(self.received)}-"]})
+
+
+def payload(fragments: int) -> bytes:
+    return os.urandom(fragments * FRAGMENT_UNIT - 100)
+
+
+@pytest.mark.asyncio
+async def test_uploads_fragments_in_order(make_client, sleeps):
+    data = payload(3)
+    session = FakeSession(len(data))
+    client = make_client(session.handler)
+    progress = []
+
+    item, metrics = await upload_in_session(
+        client, UPLOAD_URL, BytesSource(data), chunk_size=FRAGMENT_UNIT,
+        progress=lambda uploaded, total: progress.append(uploaded)
+    )
+
+    assert item == {"id": "item", "size": len(data)}
+    assert bytes(session.received) == data
+    assert session.puts == [0, FRAGMENT_UNIT, 2 * FRAGMENT_UNIT]
+    assert progress == [FRAGMENT_UNIT, 2 * FRAGMENT_UNIT, len(data)]
+    assert metrics["fragments"] == 3
+    assert metrics["resumes"] == 0
+    assert sleeps == []
+
+
+@pytest.mark.asyncio
+async def test_resumes_after_dropped_connection(make_client, sleeps):
+    data = payload(3)
+    session = FakeSession(len(data), {FRAGMENT_UNIT: httpx.ReadError("connection reset")})
+    client = make_client(session.handler)
+
+    item, metrics = await upload_in_session(client, UPLOAD_URL, BytesSource(data), chunk_size=FRAGMENT_UNIT)
+
+    assert bytes(session.received) == data
+    assert session.puts == [0, FRAGMENT_UNIT, FRAGMENT_UNIT, 2 * FRAGMENT_UNIT]
+    assert session.status_queries == 1
+    assert metrics["resumes"] == 1
+    assert len(sleeps) == 1
+
+
+@pytest.mark.asyncio
+async def test_resumes_from_server_offset_when_fragment_was_stored(make_client, sleeps):
+    data = payload(4)
+    session = FakeSession(len(data), {FRAGMENT_UNIT: ("after", 503)})
+    client = make_client(session.handler)
+
+    item, metrics = await upload_in_session(client, UPLOAD_URL, BytesSource(data), chunk_size=FRAGMENT_UNIT)
+
+    assert bytes(session.received) == data
+    # The stored fragment is not sent again: the upload continues at the next one
+    assert session.puts == [0, FRAGMENT_UNIT, 2 * FRAGMENT_UNIT, 3 * FRAGMENT_UNIT]
+    assert metrics["resumes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_throttled_fragment_waits_for_retry_after(make_client, sleeps):
+    data = payload(2)
+    session = FakeSession(len(data))
+    client = make_client(session.handler)
+    original = session.handler
+
+    def throttled_once(request: httpx.Request) -> httpx.Response:
+        if request.method == "PUT" and not session.puts:
+            session.puts.append(None)
+            return httpx.Response(429, headers={"Retry-After": "4"})
+        return original(request)
+
+    client.http = httpx.AsyncClient(transport=httpx.MockTransport(throttled_once))
+
+    item, metrics = await upload_in_session(client, UPLOAD_URL, BytesSource(data), chunk_size=FRAGMENT_UNIT)
+
+    assert bytes(session.received) == data
+    assert sleeps == [4.0]
+    assert metrics["resumes"] == 1
+    await client.http.aclose()
+
+
+@pytest.mark.asyncio
+async def test_client_error_is_not_resumed(make_client, sleeps):
+    data = payload(2)
+    session = FakeSession(len(data), {FRAGMENT_UNIT: 400})
+    client = make_client(session.handler)
+
+    with pytest.raises(GraphError) as error:
+        await upload_in_session(client, UPLOAD_URL, BytesSource(data), chunk_size=FRAGMENT_UNIT)
+    assert error.value.status_code == 400
+    assert session.status_queries == 0
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_resumes(make_client, sleeps, monkeypatch):
+    monkeypatch.setattr(upload, "UPLOAD_MAX_RESUMES", 2)
+    data = payload(2)
+    session = FakeSession(len(data))
+    client = make_client(session.handler)
+    original = session.handler
+
+    def always_failing(request: httpx.Request) -> httpx.Response:
+        if request.method == "PUT":
+            session.puts.append(None)
+            return httpx.Response(500)
+        return original(request)
+
+    client.http = httpx.AsyncClient(transport=httpx.MockTransport(always_failing))
+
+    with pytest.raises(GraphError) as error:
+        await upload_in_session(client, UPLOAD_URL, BytesSource(data), chunk_size=FRAGMENT_UNIT)
+    assert error.value.status_code == 500
+    assert len(session.puts) == 3
+    assert session.status_queries == 2
+    await client.http.aclose()
+
+
+def test_fragment_size_is_a_multiple_of_the_unit():
+    assert fragment_size(1) == FRAGMENT_UNIT
+    assert fragment_size(3 * FRAGMENT_UNIT + 1) == 3 * FRAGMENT_UNIT
+    assert fragment_size(10 ** 10) % FRAGMENT_UNIT == 0
+    assert fragment_size(10 ** 10) < 60 * 1024 * 1024
@@ -1,7 +1,16 @@
 from .base import (
-    auth_token_context
+    auth_token_context,
+    get_onedrive_client,
+    close_onedrive_clients,
+    log_request_metrics
 )
 
+from .cache import log_cache_stats
+
+from .mirror import close_mirrors
+
+from .serialize import serialize_result
+
 from .both_item import (
     onedrive_rename_item,
     onedrive_move_item,
@@ -10,6 +19,8 @@ from .both_item import (
 
 from .files import (
     onedrive_read_file_content,
+    onedrive_read_file_content_by_path,
+    onedrive_download_file,
     onedrive_overwrite_file_by_id,
     onedrive_create_file,
     onedrive_create_file_in_root
@@ -25,7 +36,23 @@ from .search_n_list import (
     onedrive_list_inside_folder,
     onedrive_search_item_by_name,
     onedrive_search_folder_by_name,
-    onedrive_get_item_by_id
+    onedrive_get_item_by_id,
+    onedrive_get_item_by_path,
+    onedrive_list_folder_by_path
+)
+
+from .tree import (
+    onedrive_walk_tree,
+    onedrive_folder_stats
+)
+
+from .bulk_upload import onedrive_upload_directory
+
+from .batch import (
+    onedrive_batch_get_items,
+    onedrive_batch_delete_items,
+    onedrive_batch_move_items,
+    onedrive_batch_rename_items
 )
 
 from .sharing import (
@@ -36,6 +63,12 @@ from .sharing import (
 __all__ = [
     # Base
     "auth_token_context",
+    "get_onedrive_client",
+    "close_onedrive_clients",
+    "log_request_metrics",
+    "log_cache_stats",
+    "close_mirrors",
+    "serialize_result",
 
     # Both Items (Files & Folders)
     "onedrive_rename_item",
@@ -44,6 +77,8 @@ __all__ = [
 
     # Files
     "onedrive_read_file_content",
+    "onedrive_read_file_content_by_path",
+    "onedrive_download_file",
     "onedrive_overwrite_file_by_id",
     "onedrive_create_file",
     "onedrive_create_file_in_root",
@@ -58,6 +93,21 @@ __all__ = [
     "onedrive_search_item_by_name",
     "onedrive_search_folder_by_name",
     "onedrive_get_item_by_id",
+    "onedrive_get_item_by_path",
+    "onedrive_list_folder_by_path",
+
+    # Tree
+    "onedrive_walk_tree",
+    "onedrive_folder_stats",
+
+    # Bulk upload
+    "onedrive_upload_directory",
+
+    # Batch
+    "onedrive_batch_get_items",
+    "onedrive_batch_delete_items",
+    "onedrive_batch_move_items",
+    "onedrive_batch_rename_items",
 
     # Sharing
     "onedrive_list_shared_items",
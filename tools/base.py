@@ -1,7 +1,18 @@
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
 import logging
 import os
+import random
+import time
+from collections import OrderedDict, deque
 from contextvars import ContextVar
-from typing import Optional
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set, Union
+
+import httpx
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -11,6 +22,53 @@ logger = logging.getLogger(__name__)
 
 auth_token_context: ContextVar[str] = ContextVar('auth_token')
 
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+
+# Per-token connection pool settings (can be overridden via environment)
+HTTP_MAX_CONNECTIONS = int(os.getenv("ONEDRIVE_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ONEDRIVE_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("ONEDRIVE_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("ONEDRIVE_HTTP_TIMEOUT", "30"))
+
+# Client registry settings: how many tokens keep a warm pool, and for how long
+CLIENT_POOL_SIZE = int(os.getenv("ONEDRIVE_CLIENT_POOL_SIZE", "32"))
+CLIENT_IDLE_TIMEOUT = float(os.getenv("ONEDRIVE_CLIENT_IDLE_TIMEOUT", "300"))
+
+# Retry policy for throttled and transient failures
+RETRY_MAX_ATTEMPTS = int(os.getenv("ONEDRIVE_RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("ONEDRIVE_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("ONEDRIVE_RETRY_MAX_DELAY", "60"))
+
+# Per-tenant limits; these are ceilings that the limiter backs off from on 429s
+RATE_LIMIT_RPS = float(os.getenv("ONEDRIVE_RATE_LIMIT_RPS", "40"))
+RATE_LIMIT_BURST = float(os.getenv("ONEDRIVE_RATE_LIMIT_BURST", "80"))
+MAX_CONCURRENCY = int(os.getenv("ONEDRIVE_MAX_CONCURRENCY", "16"))
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+TRANSIENT_STATUSES = frozenset({500, 502, 503, 504})
+# Raised before the request reached Graph, so any method may be resent
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Process-wide request counters, for logs and diagnostics
+request_metrics: Dict[str, float] = {
+    "requests": 0,
+    "retries": 0,
+    "throttled": 0,
+    "transport_errors": 0,
+    "gave_up": 0,
+    "retry_wait_seconds": 0.0
+}
+
+def log_request_metrics() -> None:
+    """
+    Log the process-wide request counters (retries, throttling, requests that gave up).
+    """
+    logger.info(
+        "Graph requests: {requests:.0f} sent, {retries:.0f} retries, {throttled:.0f} throttled, "
+        "{transport_errors:.0f} transport errors, {gave_up:.0f} gave up, "
+        "{retry_wait_seconds:.1f}s waited before retrying".format(**request_metrics)
+    )
+
 def get_auth_token() -> str:
     try:
         token = auth_token_context.get()
@@ -25,16 +83,466 @@ def get_auth_token() -> str:
             raise RuntimeError("Authentication token not found in context or environment")
         return token
 
-def get_onedrive_client() -> Optional[dict]:
+class GraphError(Exception):
     """
-    Return a simple client dict with base_url and headers.
+    Raised by shared helpers when Graph answers with an error status.
+    """
+
+    def __init__(self, status_code: Union[int, str], text: str):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+def token_identity(token: str) -> str:
+    """
+    Return a short, non-reversible key identifying an auth token.
+    """
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """
+    Read a Retry-After header (seconds or HTTP date) as a delay in seconds.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter for the given retry attempt (0-based).
+    """
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+def should_retry_status(method: str, response: httpx.Response) -> bool:
+    """
+    Whether a response may be retried.
+
+    429, and 503 with Retry-After, mean Graph throttled the request without
+    processing it, so any method is retried. Other transient 5xx responses
+    are retried only for idempotent methods.
+    """
+    status = response.status_code
+    if status == 429 or (status == 503 and "Retry-After" in response.headers):
+        return True
+    return status in TRANSIENT_STATUSES and method in IDEMPOTENT_METHODS
+
+def should_retry_error(method: str, error: Exception) -> bool:
+    """
+    Whether a transport error may be retried: always if nothing was sent, else only for idempotent methods.
+    """
+    if isinstance(error, _NOT_SENT_ERRORS):
+        return True
+    return isinstance(error, httpx.TransportError) and method in IDEMPOTENT_METHODS
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+def tenant_key(token: str) -> str:
+    """
+    Key requests are limited by: the tenant ID (tid claim) for Entra ID JWTs, else the token identity.
+
+    The claim is only read, not verified; Graph verifies the token.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        if claims.get("tid"):
+            return f"tenant:{claims['tid']}"
+    except (IndexError, ValueError, AttributeError):
+        pass
+    return f"token:{token_identity(token)}"
+
+
+class TenantLimiter:
+    """
+    Token-bucket rate limiter and concurrency governor shared by all clients of one tenant.
+
+    Both limits adapt AIMD-style: a throttled response halves the request
+    rate and the concurrency limit (at most once per second, since one
+    burst of 429s is one signal), and each successful response raises them
+    a little until the configured ceilings are reached again.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_RPS, burst: float = RATE_LIMIT_BURST, concurrency: int = MAX_CONCURRENCY):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.max_concurrency = max(1, concurrency)
+        self.concurrency = float(self.max_concurrency)
+        self.in_use = 0
+        self.last_backoff = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rate > 0
+
+    @property
+    def is_idle(self) -> bool:
+        return self.in_use == 0 and not self._waiters
+
+    async def acquire(self, cost: float = 1) -> None:
+        """
+        Wait for a concurrency slot and `cost` rate tokens.
+        """
+        if self.in_use < int(self.concurrency) and not self._waiters:
+            self.in_use += 1
+        else:
+            # release() hands the slot over by counting it before waking the waiter
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    if future in self._waiters:
+                        self._waiters.remove(future)
+                else:
+                    self.release()
+                raise
+
+        try:
+            # Tokens may go negative: each caller reserves its share and sleeps until it is covered
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= cost
+            if self.tokens < 0:
+                await asyncio.sleep(-self.tokens / self.rate)
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_use < int(self.concurrency):
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            try:
+                future.set_result(None)
+                self.in_use += 1
+            except RuntimeError:
+                # Waiter from an event loop that has since closed
+                pass
+
+    def observe(self, status_code: int) -> None:
+        """
+        Adapt the limits to a response status.
+        """
+        now = time.monotonic()
+        if status_code in (429, 503):
+            if now - self.last_backoff >= 1.0:
+                self.last_backoff = now
+                self.rate = max(1.0, self.rate / 2)
+                self.concurrency = max(1.0, self.concurrency / 2)
+                logger.warning(
+                    f"Graph throttled requests; limiting to {self.rate:.1f} req/s and {int(self.concurrency)} concurrent"
+                )
+        elif status_code < 500:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+            self.concurrency = min(float(self.max_concurrency), self.concurrency + 1 / self.concurrency)
+            self._wake()
+
+
+# tenant key -> limiter
+_limiters: Dict[str, TenantLimiter] = {}
+
+def get_limiter(token: str) -> Optional[TenantLimiter]:
+    """
+    Return the shared limiter for the token's tenant, or None if rate limiting is disabled.
+    """
+    if RATE_LIMIT_RPS <= 0:
+        return None
+    key = tenant_key(token)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = TenantLimiter()
+        _limiters[key] = limiter
+    return limiter
+
+
+class OneDriveClient:
+    """
+    Graph client bound to a single auth token.
+
+    Holds its own pool of keep-alive connections so repeated calls with the
+    same token reuse warm TCP/TLS connections. Instances are cached by
+    get_onedrive_client() and should not be created directly by tools.
+    """
+
+    def __init__(self, token: str, base_url: str = GRAPH_BASE_URL):
+        self.token_key = token_identity(token)
+        self.base_url = base_url
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.loop = _running_loop()
+        self.last_used = time.monotonic()
+        self.in_flight = 0
+        self.coalescer = None
+        # Set by mirror.get_mirror on first use
+        self.drive_id: Optional[str] = None
+        self.limiter = get_limiter(token)
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True
+        )
+
+    @property
+    def is_closed(self) -> bool:
+        return self.http.is_closed
+
+    def is_idle(self, now: float) -> bool:
+        return self.in_flight == 0 and now - self.last_used > CLIENT_IDLE_TIMEOUT
+
+    async def request(
+            self,
+            method: str,
+            url: str,
+            headers: Optional[Dict[str, str]] = None,
+            authenticated: bool = True,
+            coalesce: bool = True,
+            retry: bool = True,
+            **kwargs: Any
+    ) -> httpx.Response:
+        """
+        Send a request through this client's connection pool.
+
+        Throttled (429/503) and transient failures are retried up to
+        RETRY_MAX_ATTEMPTS times, waiting for Retry-After when Graph sends
+        it and for a jittered exponential backoff otherwise. Non-idempotent
+        methods are only resent when Graph cannot have processed them.
+
+        Parameters:
+        - method: HTTP method
+        - url: Absolute URL (Graph or pre-authenticated upload/download URL)
+        - headers: Extra headers merged over the auth header
+        - authenticated: Set False for pre-authenticated URLs that must not carry the token
+        - coalesce: Allow merging into a $batch call when request coalescing is enabled
+        - retry: Set False where the caller has its own recovery (e.g. upload session fragments)
+        - kwargs: Passed through to httpx (json, content, params, ...)
+        """
+        attempts = RETRY_MAX_ATTEMPTS if retry else 0
+        for attempt in range(attempts + 1):
+            request_metrics["requests"] += 1
+            try:
+                response = await self._send(method, url, headers, authenticated, coalesce, kwargs)
+            except httpx.TransportError as e:
+                request_metrics["transport_errors"] += 1
+                if not should_retry_error(method, e):
+                    raise
+                if attempt == attempts:
+                    if attempts:
+                        request_metrics["gave_up"] += 1
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"{method} {url} failed ({e!r}); retry {attempt + 1}/{attempts} in {delay:.2f}s")
+            else:
+                if not should_retry_status(method, response):
+                    return response
+                if response.status_code in (429, 503):
+                    request_metrics["throttled"] += 1
+                if attempt == attempts:
+                    if attempts:
+                        request_metrics["gave_up"] += 1
+                    return response
+                waited = retry_after(response)
+                delay = min(waited, RETRY_MAX_DELAY) if waited is not None else backoff_delay(attempt)
+                logger.warning(
+                    f"{method} {url} returned {response.status_code}; retry {attempt + 1}/{attempts} in {delay:.2f}s"
+                )
+
+            request_metrics["retries"] += 1
+            request_metrics["retry_wait_seconds"] += delay
+            await asyncio.sleep(delay)
+
+    async def _send(
+            self,
+            method: str,
+            url: str,
+            headers: Optional[Dict[str, str]],
+            authenticated: bool,
+            coalesce: bool,
+            kwargs: Dict[str, Any]
+    ) -> httpx.Response:
+        if coalesce and authenticated:
+            from . import batch  # deferred: batch imports this module
+            if batch.can_coalesce(self, method, url, kwargs):
+                return await batch.coalesce_request(self, method, url, headers, kwargs)
+
+        merged = {**self.headers, **(headers or {})} if authenticated else dict(headers or {})
+        self.in_flight += 1
+        self.last_used = time.monotonic()
+        try:
+            async with self._limit(_request_cost(url, kwargs), authenticated):
+                response = await self.http.request(method, url, headers=merged, **kwargs)
+                if self.limiter is not None and authenticated:
+                    self.limiter.observe(response.status_code)
+                return response
+        finally:
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    @contextlib.asynccontextmanager
+    async def _limit(self, cost: float = 1, authenticated: bool = True) -> AsyncIterator[None]:
+        # Pre-authenticated upload/download hosts are not Graph and do not count against the tenant
+        if self.limiter is None or not authenticated:
+            yield
+            return
+        await self.limiter.acquire(cost)
+        try:
+            yield
+        finally:
+            self.limiter.release()
+
+    @contextlib.asynccontextmanager
+    async def stream(
+            self,
+            method: str,
+            url: str,
+            headers: Optional[Dict[str, str]] = None,
+            authenticated: bool = True,
+            **kwargs: Any
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Send a request and stream the response body instead of loading it.
+
+        Use as `async with client.stream("GET", url) as response:`; the
+        connection returns to the pool when the block exits. The tenant
+        concurrency slot is only held until the response headers arrive,
+        so a long body transfer does not hold up other Graph calls.
+        """
+        merged = {**self.headers, **(headers or {})} if authenticated else dict(headers or {})
+        self.in_flight += 1
+        self.last_used = time.monotonic()
+        try:
+            request = self.http.build_request(method, url, headers=merged, **kwargs)
+            async with self._limit(authenticated=authenticated):
+                response = await self.http.send(request, stream=True)
+                if self.limiter is not None and authenticated:
+                    self.limiter.observe(response.status_code)
+            try:
+                yield response
+            finally:
+                await response.aclose()
+        finally:
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    async def aclose(self) -> None:
+        if not self.http.is_closed:
+            await self.http.aclose()
+
+
+def _request_cost(url: str, kwargs: Dict[str, Any]) -> float:
+    """
+    Rate tokens a request uses: Graph counts each $batch sub-request separately.
+    """
+    if url.endswith("/$batch") and isinstance(kwargs.get("json"), dict):
+        return max(1, len(kwargs["json"].get("requests", [])))
+    return 1
+
+
+# token identity -> client, least recently used first
+_clients: "OrderedDict[str, OneDriveClient]" = OrderedDict()
+_closing: Set[asyncio.Task] = set()
+
+def _discard_client(client: OneDriveClient) -> None:
+    """
+    Close an evicted client in the background if its event loop is still running.
+    """
+    loop = _running_loop()
+    if client.loop is not None and client.loop is loop and not client.is_closed:
+        task = loop.create_task(client.aclose())
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+def _evict_clients() -> None:
+    """
+    Drop idle clients and trim the registry to CLIENT_POOL_SIZE, along with limiters no client uses.
+    """
+    now = time.monotonic()
+    for key, client in list(_clients.items()):
+        if client.is_idle(now):
+            logger.debug(f"Evicting idle OneDrive client {key}")
+            del _clients[key]
+            _discard_client(client)
+
+    # Oldest first; clients with requests in flight are kept even over the limit
+    for key, client in list(_clients.items()):
+        if len(_clients) <= CLIENT_POOL_SIZE:
+            break
+        if client.in_flight == 0:
+            logger.debug(f"Evicting least recently used OneDrive client {key}")
+            del _clients[key]
+            _discard_client(client)
+
+    # A tenant's limiter goes with its last pooled client, once no request holds or waits for a slot
+    pooled = {id(client.limiter) for client in _clients.values()}
+    for key, limiter in list(_limiters.items()):
+        if id(limiter) not in pooled and limiter.is_idle:
+            logger.debug(f"Dropping rate limiter for {key}")
+            del _limiters[key]
+
+def get_onedrive_client() -> Optional[OneDriveClient]:
+    """
+    Return the pooled OneDriveClient for the current auth token.
     """
     try:
         auth_token = get_auth_token()
-        client = {
-            "base_url": "https://graph.microsoft.com/v1.0",
-            "headers": {'Authorization': f'Bearer {auth_token}'}
-        }
+        key = token_identity(auth_token)
+        loop = _running_loop()
+
+        client = _clients.get(key)
+        if client is not None and (client.is_closed or client.loop is not loop):
+            # Connections are bound to the loop that opened them
+            del _clients[key]
+            _discard_client(client)
+            client = None
+
+        if client is None:
+            client = OneDriveClient(auth_token)
+            _clients[key] = client
+            logger.debug(f"Created OneDrive client {key}")
+        _clients.move_to_end(key)
+        client.last_used = time.monotonic()
+
+        _evict_clients()
         return client
     except RuntimeError as e:
         logger.warning(f"Failed to get auth token: {e}")
@@ -43,5 +551,20 @@ def get_onedrive_client() -> Optional[dict]:
         logger.error(f"Failed to initialize OneDrive client: {e}")
         return None
 
+async def close_onedrive_clients() -> None:
+    """
+    Close every pooled client and release its connections.
+    """
+    clients = list(_clients.values())
+    _clients.clear()
+    _limiters.clear()
+    loop = _running_loop()
+    for client in clients:
+        if client.loop is None or client.loop is loop:
+            await client.aclose()
+    if _closing:
+        await asyncio.gather(*_closing, return_exceptions=True)
+    logger.info(f"Closed {len(clients)} OneDrive client(s)")
+
 if __name__ == "__main__":
     print(get_onedrive_client())
@@ -0,0 +1,583 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Tuple, Union, Dict, List, Any, Optional
+
+import httpx
+
+from .base import (
+    get_onedrive_client,
+    OneDriveClient,
+    GraphError,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+    backoff_delay,
+    request_metrics
+)
+from .cache import invalidate_items
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Graph accepts at most 20 sub-requests per $batch call
+BATCH_MAX_REQUESTS = 20
+BATCH_CONCURRENCY = int(os.getenv("ONEDRIVE_BATCH_CONCURRENCY", "4"))
+
+# Opt-in coalescing of concurrent single requests into $batch calls
+COALESCE_ENABLED = os.getenv("ONEDRIVE_COALESCE_REQUESTS", "false").lower() in ("1", "true", "yes")
+COALESCE_WINDOW_MS = float(os.getenv("ONEDRIVE_COALESCE_WINDOW_MS", "5"))
+COALESCE_METHODS = ("GET", "POST", "PATCH", "DELETE")
+
+
+class GraphBatchError(GraphError):
+    """
+    Raised when a whole $batch call fails (as opposed to a single sub-request).
+    """
+
+
+def batch_request(
+        request_id: str,
+        method: str,
+        url: str,
+        body: Optional[Dict[str, Any]] = None,
+        depends_on: Optional[List[str]] = None,
+        headers: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Build one $batch sub-request.
+
+    Parameters:
+    - request_id: Unique ID of the sub-request within the batch
+    - method: HTTP method
+    - url: URL relative to the Graph version root (e.g. /me/drive/items/{id})
+    - body: JSON body (optional)
+    - depends_on: IDs of sub-requests that must complete first (optional)
+    - headers: Extra sub-request headers (optional)
+    """
+    request = {"id": request_id, "method": method, "url": url}
+    if headers:
+        request["headers"] = dict(headers)
+    if body is not None:
+        request["body"] = body
+        request.setdefault("headers", {})["Content-Type"] = "application/json"
+    if depends_on:
+        request["dependsOn"] = list(depends_on)
+    return request
+
+
+def _chunk_requests(requests: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Pack sub-requests into chunks of at most BATCH_MAX_REQUESTS.
+
+    Requests linked through dependsOn must travel in the same batch, so each
+    dependency group is kept together and groups are packed in input order.
+    """
+    parent = {r["id"]: r["id"] for r in requests}
+
+    def find(x: str) -> str:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for request in requests:
+        for dep in request.get("dependsOn", []):
+            if dep not in parent:
+                raise ValueError(f"Sub-request {request['id']} depends on unknown request {dep}")
+            parent[find(request["id"])] = find(dep)
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for request in requests:
+        groups.setdefault(find(request["id"]), []).append(request)
+
+    chunks: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    for group in groups.values():
+        if len(group) > BATCH_MAX_REQUESTS:
+            raise ValueError(f"Dependency chain of {len(group)} requests exceeds the $batch limit of {BATCH_MAX_REQUESTS}")
+        if len(current) + len(group) > BATCH_MAX_REQUESTS:
+            chunks.append(current)
+            current = []
+        current.extend(group)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _throttle_delay(sub: Dict[str, Any]) -> Optional[float]:
+    """
+    Return the Retry-After delay of a throttled sub-response (0 if none given), or None if it was not throttled.
+    """
+    status = sub.get("status")
+    headers = httpx.Headers(sub.get("headers") or {})
+    if status != 429 and not (status == 503 and "Retry-After" in headers):
+        return None
+    try:
+        return float(headers.get("Retry-After", 0))
+    except ValueError:
+        return 0.0
+
+
+async def _send_batch(client: OneDriveClient, chunk: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Send one $batch call, resending throttled sub-requests.
+
+    Graph throttles sub-requests individually, so a successful $batch call
+    can still contain 429s. Those are sent again in a smaller batch after
+    their Retry-After, together with sub-requests that failed with 424
+    only because a throttled request they depend on did not run.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = chunk
+    for attempt in range(RETRY_MAX_ATTEMPTS + 1):
+        response = await client.post(f"{client.base_url}/$batch", json={"requests": pending})
+        if not response.is_success:
+            raise GraphBatchError(response.status_code, response.text)
+        responses = {r["id"]: r for r in response.json().get("responses", [])}
+        results.update(responses)
+
+        delays = {}
+        for request in pending:
+            delay = _throttle_delay(responses.get(request["id"], {}))
+            if delay is not None:
+                delays[request["id"]] = delay
+        if not delays or attempt == RETRY_MAX_ATTEMPTS:
+            break
+        if client.limiter is not None:
+            client.limiter.observe(429)
+
+        retry_ids = set(delays)
+        for request in pending:
+            if responses.get(request["id"], {}).get("status") == 424 and retry_ids & set(request.get("dependsOn", [])):
+                retry_ids.add(request["id"])
+        pending = []
+        for request in chunk:
+            if request["id"] in retry_ids:
+                request = dict(request)
+                depends_on = [dep for dep in request.get("dependsOn", []) if dep in retry_ids]
+                if depends_on:
+                    request["dependsOn"] = depends_on
+                else:
+                    request.pop("dependsOn", None)
+                pending.append(request)
+
+        delay = min(max(delays.values()), RETRY_MAX_DELAY) or backoff_delay(attempt)
+        request_metrics["throttled"] += len(delays)
+        request_metrics["retries"] += 1
+        request_metrics["retry_wait_seconds"] += delay
+        logger.warning(f"{len(delays)} $batch sub-requests throttled; resending {len(pending)} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+    return results
+
+
+def _skipped_response(request_id: str) -> Dict[str, Any]:
+    return {
+        "id": request_id,
+        "status": 424,
+        "headers": {},
+        "body": {"error": {"code": "skipped", "message": "Not sent: an earlier request in the ordered batch failed"}}
+    }
+
+
+async def graph_batch(
+        client: OneDriveClient,
+        requests: List[Dict[str, Any]],
+        ordered: bool = False
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Execute sub-requests through the Graph $batch endpoint.
+
+    Parameters:
+    - client: OneDrive client to send the batches with
+    - requests: Sub-requests built with batch_request()
+    - ordered: Run every sub-request strictly after the previous one.
+               Each batch is chained with dependsOn and batches are sent one at a time.
+               After a failure Graph answers the rest of that batch with 424, and later
+               batches are not sent: their sub-requests get a 424 "skipped" response.
+
+    Returns:
+    - Dictionary mapping sub-request ID to its response ({"id", "status", "headers", "body"})
+    """
+    if ordered:
+        chunks = [
+            [dict(r) for r in requests[i:i + BATCH_MAX_REQUESTS]]
+            for i in range(0, len(requests), BATCH_MAX_REQUESTS)
+        ]
+        for chunk in chunks:
+            for previous, request in zip(chunk, chunk[1:]):
+                request["dependsOn"] = [previous["id"]]
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for index, chunk in enumerate(chunks):
+            results.update(await _send_batch(client, chunk))
+            # The last sub-request only succeeds if the whole chain up to it did
+            status = results.get(chunk[-1]["id"], {}).get("status")
+            if status is None or not 200 <= status < 300:
+                skipped = [request["id"] for later in chunks[index + 1:] for request in later]
+                if skipped:
+                    logger.warning(f"Ordered $batch stopped after a failure; skipping {len(skipped)} sub-requests")
+                for request_id in skipped:
+                    results[request_id] = _skipped_response(request_id)
+                break
+        return results
+
+    chunks = _chunk_requests(requests)
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def send(chunk: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        async with semaphore:
+            return await _send_batch(client, chunk)
+
+    results = {}
+    for chunk_results in await asyncio.gather(*(send(chunk) for chunk in chunks)):
+        results.update(chunk_results)
+    return results
+
+
+class RequestCoalescer:
+    """
+    Merges single Graph requests for one client into $batch calls.
+
+    Requests arriving within the coalescing window are sent together (up to
+    BATCH_MAX_REQUESTS per call) and each caller receives its own sub-response
+    as a regular httpx.Response, so tools are unaware of the batching.
+    """
+
+    def __init__(self, client: OneDriveClient, window: float):
+        self.client = client
+        self.window = window
+        self._pending: List[Tuple[str, str, Optional[Dict[str, str]], Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def submit(
+            self,
+            method: str,
+            url: str,
+            headers: Optional[Dict[str, str]],
+            body: Any
+    ) -> httpx.Response:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((method, url, headers, body, future))
+
+        if len(self._pending) >= BATCH_MAX_REQUESTS:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._send(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, pending: List[Tuple[str, str, Optional[Dict[str, str]], Any, asyncio.Future]]) -> None:
+        if len(pending) == 1:
+            method, url, headers, body, future = pending[0]
+            kwargs = {"json": body} if body is not None else {}
+            try:
+                response = await self.client.request(
+                    method, url, headers=headers, coalesce=False, retry=False, **kwargs
+                )
+                if not future.done():
+                    future.set_result(response)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        base_len = len(self.client.base_url)
+        requests = [
+            batch_request(str(i), method, url[base_len:], body=body, headers=headers)
+            for i, (method, url, headers, body, _) in enumerate(pending)
+        ]
+
+        try:
+            logger.debug(f"Flushing {len(requests)} coalesced requests as one $batch call")
+            response = await self.client.post(
+                f"{self.client.base_url}/$batch",
+                json={"requests": requests},
+                coalesce=False,
+                # Each caller's own request() retries its throttled sub-request
+                retry=False
+            )
+        except Exception as e:
+            for *_, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if response.is_success:
+            responses = {r["id"]: r for r in response.json().get("responses", [])}
+            if self.client.limiter is not None and any(_throttle_delay(r) is not None for r in responses.values()):
+                self.client.limiter.observe(429)
+        else:
+            # The whole batch failed (e.g. throttled); every caller sees that response
+            responses = {}
+
+        for i, (method, url, _, _, future) in enumerate(pending):
+            if future.done():
+                continue
+            sub = responses.get(str(i))
+            if sub is None:
+                future.set_result(httpx.Response(
+                    response.status_code,
+                    headers=response.headers,
+                    content=response.content,
+                    request=httpx.Request(method, url)
+                ))
+            else:
+                future.set_result(_sub_response(method, url, sub))
+
+
+def _sub_response(method: str, url: str, sub: Dict[str, Any]) -> httpx.Response:
+    """
+    Build an httpx.Response from one $batch sub-response.
+    """
+    body = sub.get("body")
+    if body is None:
+        content = b""
+    elif isinstance(body, (dict, list)):
+        content = json.dumps(body).encode('utf-8')
+    else:
+        content = str(body).encode('utf-8')
+    return httpx.Response(
+        sub.get("status", 500),
+        headers=sub.get("headers", {}),
+        content=content,
+        request=httpx.Request(method, url)
+    )
+
+
+def can_coalesce(client: OneDriveClient, method: str, url: str, kwargs: Dict[str, Any]) -> bool:
+    """
+    Whether a request may be merged into a $batch call.
+
+    Only metadata requests against the Graph API qualify: file content,
+    pre-authenticated URLs and $batch itself are always sent directly.
+    """
+    if not COALESCE_ENABLED or method not in COALESCE_METHODS:
+        return False
+    if not url.startswith(client.base_url):
+        return False
+    path = url[len(client.base_url):]
+    if path.startswith("/$batch") or "/content" in path:
+        return False
+    return set(kwargs) <= {"json"}
+
+
+async def coalesce_request(
+        client: OneDriveClient,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        kwargs: Dict[str, Any]
+) -> httpx.Response:
+    """
+    Queue a request on the client's coalescer and wait for its sub-response.
+    """
+    if client.coalescer is None:
+        client.coalescer = RequestCoalescer(client, COALESCE_WINDOW_MS / 1000)
+    return await client.coalescer.submit(method, url, headers, kwargs.get("json"))
+
+
+def _item_results(
+        item_ids: List[str],
+        responses: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Turn $batch responses (keyed by item index) into per-item results.
+    """
+    results = []
+    failed = 0
+    for index, item_id in enumerate(item_ids):
+        response = responses.get(str(index), {})
+        status = response.get("status")
+        success = status is not None and 200 <= status < 300
+        result = {"item_id": item_id, "status": status, "success": success}
+        body = response.get("body")
+        if success:
+            if body:
+                result["item"] = body
+        else:
+            failed += 1
+            result["error"] = body.get("error", body) if isinstance(body, dict) else body
+        results.append(result)
+
+    return {
+        "succeeded": len(item_ids) - failed,
+        "failed": failed,
+        "results": results
+    }
+
+
+async def onedrive_batch_get_items(item_ids: List[str]) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+    """
+    Get details of many items using Graph $batch (20 items per request).
+
+    Parameters:
+    - item_ids: IDs of the items to retrieve
+
+    Returns:
+    - On success: Tuple with status message and per-item results
+    - On failure: Tuple with error message and details
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    requests = [
+        batch_request(str(i), "GET", f"/me/drive/items/{item_id}")
+        for i, item_id in enumerate(item_ids)
+    ]
+
+    try:
+        logger.info(f"Batch getting {len(item_ids)} items")
+        responses = await graph_batch(client, requests)
+        results = _item_results(item_ids, responses)
+        logger.info(f"Batch get finished: {results['succeeded']} succeeded, {results['failed']} failed")
+        return ("Batch results:", results)
+    except GraphBatchError as e:
+        logger.error(f"Error in batch get: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception during batch get: {e}")
+        return ("Error:", str(e))
+
+
+async def onedrive_batch_delete_items(item_ids: List[str]) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+    """
+    Delete many items using Graph $batch (20 items per request).
+
+    Parameters:
+    - item_ids: IDs of the items to delete
+
+    Returns:
+    - On success: Tuple with status message and per-item results
+    - On failure: Tuple with error message and details
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    requests = [
+        batch_request(str(i), "DELETE", f"/me/drive/items/{item_id}")
+        for i, item_id in enumerate(item_ids)
+    ]
+
+    try:
+        logger.info(f"Batch deleting {len(item_ids)} items")
+        responses = await graph_batch(client, requests)
+        invalidate_items(client, *item_ids)
+        results = _item_results(item_ids, responses)
+        logger.info(f"Batch delete finished: {results['succeeded']} succeeded, {results['failed']} failed")
+        return ("Batch results:", results)
+    except GraphBatchError as e:
+        logger.error(f"Error in batch delete: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception during batch delete: {e}")
+        return ("Error:", str(e))
+
+
+async def onedrive_batch_move_items(
+        item_ids: List[str],
+        new_parent_id: str,
+        ordered: bool = False
+) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+    """
+    Move many items into one folder using Graph $batch (20 items per request).
+
+    Parameters:
+    - item_ids: IDs of the items to move
+    - new_parent_id: ID of the destination folder
+    - ordered: Move items strictly in the given order (uses dependsOn)
+
+    Returns:
+    - On success: Tuple with status message and per-item results
+    - On failure: Tuple with error message and details
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    requests = [
+        batch_request(
+            str(i),
+            "PATCH",
+            f"/me/drive/items/{item_id}",
+            body={"parentReference": {"id": new_parent_id}}
+        )
+        for i, item_id in enumerate(item_ids)
+    ]
+
+    try:
+        logger.info(f"Batch moving {len(item_ids)} items to parent {new_parent_id}")
+        responses = await graph_batch(client, requests, ordered=ordered)
+        invalidate_items(client, *item_ids)
+        results = _item_results(item_ids, responses)
+        logger.info(f"Batch move finished: {results['succeeded']} succeeded, {results['failed']} failed")
+        return ("Batch results:", results)
+    except GraphBatchError as e:
+        logger.error(f"Error in batch move: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception during batch move: {e}")
+        return ("Error:", str(e))
+
+
+async def onedrive_batch_rename_items(
+        renames: List[Dict[str, str]],
+        ordered: bool = False
+) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+    """
+    Rename many items using Graph $batch (20 items per request).
+
+    Parameters:
+    - renames: List of {"item_id": ..., "new_name": ...}
+    - ordered: Rename items strictly in the given order (uses dependsOn),
+               e.g. when swapping names between items
+
+    Returns:
+    - On success: Tuple with status message and per-item results
+    - On failure: Tuple with error message and details
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    item_ids = [rename["item_id"] for rename in renames]
+    requests = [
+        batch_request(
+            str(i),
+            "PATCH",
+            f"/me/drive/items/{rename['item_id']}",
+            body={"name": rename["new_name"]}
+        )
+        for i, rename in enumerate(renames)
+    ]
+
+    try:
+        logger.info(f"Batch renaming {len(renames)} items")
+        responses = await graph_batch(client, requests, ordered=ordered)
+        invalidate_items(client, *item_ids)
+        results = _item_results(item_ids, responses)
+        logger.info(f"Batch rename finished: {results['succeeded']} succeeded, {results['failed']} failed")
+        return ("Batch results:", results)
+    except GraphBatchError as e:
+        logger.error(f"Error in batch rename: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception during batch rename: {e}")
+        return ("Error:", str(e))
@@ -1,7 +1,7 @@
 import logging
-import requests
 from typing import Tuple, Union
 from .base import get_onedrive_client
+from .cache import invalidate_items
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -23,18 +23,19 @@ async def onedrive_rename_item(file_id: str, new_name: str) -> Union[Tuple[str,
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/items/{file_id}"
+    url = f"{client.base_url}/me/drive/items/{file_id}"
     data = {"name": new_name}
 
     try:
         logger.info(f"Renaming item {file_id} to {new_name}")
-        response = requests.patch(
+        response = await client.patch(
             url,
-            headers={**client['headers'], "Content-Type": "application/json"},
+            headers={"Content-Type": "application/json"},
             json=data
         )
 
-        if response.ok:
+        if response.is_success:
+            invalidate_items(client, file_id)
             logger.info(f"Successfully renamed item {file_id}")
             return ("Renamed successfully:", response.json())
         else:
@@ -61,16 +62,17 @@ async def onedrive_move_item(item_id: str, new_parent_id: str) -> Union[Tuple[st
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/items/{item_id}"
+    url = f"{client.base_url}/me/drive/items/{item_id}"
     body = {
         "parentReference": {"id": new_parent_id}
     }
 
     try:
         logger.info(f"Moving item {item_id} to parent {new_parent_id}")
-        response = requests.patch(url, headers=client['headers'], json=body)
+        response = await client.patch(url, json=body)
 
-        if response.ok:
+        if response.is_success:
+            invalidate_items(client, item_id)
             logger.info(f"Successfully moved item {item_id}")
             return ("Item moved:", response.json())
         else:
@@ -96,13 +98,14 @@ async def onedrive_delete_item(item_id: str) -> Union[Tuple[str], Tuple[str, int
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/items/{item_id}"
+    url = f"{client.base_url}/me/drive/items/{item_id}"
 
     try:
         logger.info(f"Deleting item {item_id}")
-        response = requests.delete(url, headers=client['headers'])
+        response = await client.delete(url)
 
         if response.status_code == 204:
+            invalidate_items(client, item_id)
             logger.info(f"Successfully deleted item {item_id}")
             return (f"Item {item_id} deleted.",)
         else:
@@ -0,0 +1,333 @@
+import asyncio
+import base64
+import logging
+import os
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Union
+from urllib.parse import quote
+
+from .base import get_onedrive_client, OneDriveClient, GraphError
+from .batch import batch_request, graph_batch
+from .cache import invalidate_items
+from .local_files import confine_local_path, LocalPathError
+from .paths import resolve_item_id
+from .tree import TreeWalker
+from .upload import upload_source, FileSource
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Files uploaded at once by onedrive_upload_directory
+BULK_UPLOAD_CONCURRENCY = int(os.getenv("ONEDRIVE_BULK_UPLOAD_CONCURRENCY", "8"))
+
+# Fields needed to compare remote files with local ones
+_SYNC_SELECT = "id,name,size,file,folder,cTag,eTag"
+
+# QuickXorHash: every byte is XORed into a 160-bit register at a position
+# that advances 11 bits per byte, so bytes 160 apart land on the same position
+_QUICKXOR_WIDTH = 160
+_QUICKXOR_BLOCK_BITS = _QUICKXOR_WIDTH * 8
+_QUICKXOR_MASK = (1 << _QUICKXOR_WIDTH) - 1
+_HASH_READ_SIZE = _QUICKXOR_WIDTH * 8192
+
+
+def _fold_blocks(data: bytes) -> int:
+    """
+    XOR all 160-byte blocks of data together (as one little-endian integer).
+    """
+    blocks = -(-len(data) // _QUICKXOR_WIDTH)
+    value = int.from_bytes(data, "little")
+    while blocks > 1:
+        high = blocks // 2
+        shift = (blocks - high) * _QUICKXOR_BLOCK_BITS
+        value = (value & ((1 << shift) - 1)) ^ (value >> shift)
+        blocks -= high
+    return value
+
+
+def quick_xor_hash(path: str) -> str:
+    """
+    Compute the QuickXorHash OneDrive reports in file.hashes.quickXorHash.
+
+    Returns:
+    - Base64-encoded 20-byte digest
+    """
+    folded = 0
+    length = 0
+    with open(path, "rb") as f:
+        # Reads are a multiple of 160 bytes, so block boundaries stay aligned with the file
+        while chunk := f.read(_HASH_READ_SIZE):
+            folded ^= _fold_blocks(chunk)
+            length += len(chunk)
+
+    register = 0
+    for index, byte in enumerate(folded.to_bytes(_QUICKXOR_WIDTH, "little")):
+        if byte:
+            shifted = byte << (index * 11 % _QUICKXOR_WIDTH)
+            register ^= (shifted & _QUICKXOR_MASK) | (shifted >> _QUICKXOR_WIDTH)
+
+    digest = bytearray(register.to_bytes(_QUICKXOR_WIDTH // 8, "little"))
+    for i, byte in enumerate(length.to_bytes(8, "little")):
+        digest[_QUICKXOR_WIDTH // 8 - 8 + i] ^= byte
+    return base64.b64encode(bytes(digest)).decode("ascii")
+
+
+class LocalFile(NamedTuple):
+    path: str  # absolute local path, symlinks resolved
+    relative: str  # "/"-separated path below the uploaded directory
+    size: int
+
+
+def scan_directory(local_dir: str) -> Tuple[List[str], List[LocalFile], List[Dict[str, str]]]:
+    """
+    List the folders and files below a local directory.
+
+    Every file is resolved and checked against ONEDRIVE_LOCAL_ROOT, so a
+    symlink pointing outside the root is skipped like any other path would
+    be rejected; so are broken links and anything that is not a regular file.
+    Symlinked folders are not descended into.
+
+    Returns:
+    - Tuple of relative folder paths (parents before children), files, and skipped files with the reason
+    """
+    folders = []
+    files = []
+    skipped = []
+    for current, dirnames, filenames in os.walk(local_dir):
+        dirnames.sort()
+        relative = os.path.relpath(current, local_dir).replace(os.sep, "/")
+        relative = "" if relative == "." else relative
+        if relative:
+            folders.append(relative)
+        for name in sorted(filenames):
+            file_relative = f"{relative}/{name}" if relative else name
+            try:
+                path = confine_local_path(os.path.join(current, name))
+                if not os.path.isfile(path):
+                    skipped.append({"path": file_relative, "error": "Not a regular file or a broken link"})
+                    continue
+                files.append(LocalFile(path, file_relative, os.path.getsize(path)))
+            except (LocalPathError, OSError) as e:
+                skipped.append({"path": file_relative, "error": str(e)})
+    return folders, files, skipped
+
+
+def _parent_and_name(relative: str) -> Tuple[str, str]:
+    parent, _, name = relative.rpartition("/")
+    return parent, name
+
+
+async def _remote_tree(
+        client: OneDriveClient,
+        folder_id: str,
+        local_folders: Set[str]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Map lowercase relative paths to the remote items below the target folder.
+
+    Only remote folders that also exist locally are listed.
+    """
+    remote = {}
+    walker = TreeWalker(client, folder_id, select=_SYNC_SELECT, follow=lambda path: path.lower() in local_folders)
+    async for entry in walker.walk():
+        remote[entry.path.lower()] = entry.item
+    return remote
+
+
+async def _create_folders(
+        client: OneDriveClient,
+        folder_id: str,
+        folders: List[str],
+        remote: Dict[str, Dict[str, Any]],
+        report: Dict[str, Any]
+) -> Dict[str, str]:
+    """
+    Create the local folders missing remotely, one $batch round per tree level.
+
+    A folder that appeared since the remote tree was read (409 conflict) is
+    looked up by path in a second $batch round.
+
+    Returns:
+    - Dictionary mapping relative folder path ("" for the target) to its item ID
+    """
+    folder_ids = {"": folder_id}
+    levels: Dict[int, List[str]] = {}
+    for relative in folders:
+        item = remote.get(relative.lower())
+        if item is not None and "folder" in item:
+            folder_ids[relative] = item["id"]
+        elif item is not None:
+            report["failed"].append({"path": relative, "error": "A file with this name exists"})
+        else:
+            levels.setdefault(relative.count("/"), []).append(relative)
+
+    for depth in sorted(levels):
+        pending = []
+        for relative in levels[depth]:
+            parent, _ = _parent_and_name(relative)
+            if parent in folder_ids:
+                pending.append(relative)
+            else:
+                report["failed"].append({"path": relative, "error": "Parent folder was not created"})
+
+        requests = []
+        for i, relative in enumerate(pending):
+            parent, name = _parent_and_name(relative)
+            requests.append(batch_request(str(i), "POST", f"/me/drive/items/{folder_ids[parent]}/children", {
+                "name": name,
+                "folder": {},
+                "@microsoft.graph.conflictBehavior": "fail"
+            }))
+        responses = await graph_batch(client, requests)
+
+        conflicts = []
+        for i, relative in enumerate(pending):
+            response = responses.get(str(i), {})
+            status = response.get("status")
+            if status is not None and 200 <= status < 300:
+                folder_ids[relative] = response["body"]["id"]
+                report["folders_created"] += 1
+            elif status == 409:
+                conflicts.append(relative)
+            else:
+                report["failed"].append({"path": relative, "error": response.get("body", status)})
+
+        if conflicts:
+            lookups = []
+            for i, relative in enumerate(conflicts):
+                parent, name = _parent_and_name(relative)
+                lookups.append(batch_request(str(i), "GET", f"/me/drive/items/{folder_ids[parent]}:/{quote(name)}:"))
+            responses = await graph_batch(client, lookups)
+            for i, relative in enumerate(conflicts):
+                response = responses.get(str(i), {})
+                body = response.get("body") or {}
+                if response.get("status") == 200 and "folder" in body:
+                    folder_ids[relative] = body["id"]
+                else:
+                    report["failed"].append({"path": relative, "error": "Folder exists but could not be used"})
+
+    return folder_ids
+
+
+async def _is_unchanged(local: LocalFile, item: Optional[Dict[str, Any]]) -> bool:
+    if item is None or "file" not in item or item.get("size") != local.size:
+        return False
+    remote_hash = (item["file"].get("hashes") or {}).get("quickXorHash")
+    if not remote_hash:
+        return False
+    return await asyncio.to_thread(quick_xor_hash, local.path) == remote_hash
+
+
+async def onedrive_upload_directory(
+        local_dir: str,
+        parent_folder_id: Optional[str] = None,
+        parent_path: Optional[str] = None,
+        skip_unchanged: bool = True,
+        max_concurrency: Optional[int] = None
+) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+    """
+    Upload the contents of a local directory tree into a OneDrive folder.
+
+    Missing folders are created with $batch, one round per tree level.
+    Files are uploaded by a bounded pool of workers, largest first: small
+    files with a single PUT and large ones through resumable upload
+    sessions. Existing files are replaced, unless skip_unchanged finds the
+    same size and QuickXorHash remotely.
+
+    Parameters:
+    - local_dir: Server directory whose contents are uploaded, inside ONEDRIVE_LOCAL_ROOT
+    - parent_folder_id: ID of the OneDrive folder to upload into (optional, default root)
+    - parent_path: Path of the OneDrive folder, used when parent_folder_id is not given (optional)
+    - skip_unchanged: Skip files whose size and hash match the remote file (default True)
+    - max_concurrency: Files uploaded at once (optional, default ONEDRIVE_BULK_UPLOAD_CONCURRENCY)
+
+    Returns:
+    - On success: Tuple with status message and upload report
+    - On failure: Tuple with error message and details
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    try:
+        local_dir = confine_local_path(local_dir)
+    except LocalPathError as e:
+        logger.error(f"Rejected local directory: {e}")
+        return ("Error:", str(e))
+    if not os.path.isdir(local_dir):
+        return (f"Local directory '{local_dir}' does not exist.",)
+
+    started = time.monotonic()
+    report: Dict[str, Any] = {
+        "folders_created": 0,
+        "files_uploaded": 0,
+        "files_skipped": 0,
+        "bytes_uploaded": 0,
+        "failed": []
+    }
+
+    try:
+        if parent_folder_id is None:
+            parent_folder_id = await resolve_item_id(client, parent_path) if parent_path is not None else "root"
+        folders, files, skipped = await asyncio.to_thread(scan_directory, local_dir)
+        report["failed"].extend(skipped)
+        logger.info(f"Uploading {len(files)} files in {len(folders)} folders from {local_dir} to {parent_folder_id}")
+
+        remote = await _remote_tree(client, parent_folder_id, {folder.lower() for folder in folders})
+        folder_ids = await _create_folders(client, parent_folder_id, folders, remote, report)
+        if report["folders_created"]:
+            invalidate_items(client)
+
+        async def upload(local: LocalFile) -> None:
+            parent, name = _parent_and_name(local.relative)
+            if parent not in folder_ids:
+                report["failed"].append({"path": local.relative, "error": "Parent folder was not created"})
+                return
+            try:
+                if skip_unchanged and await _is_unchanged(local, remote.get(local.relative.lower())):
+                    report["files_skipped"] += 1
+                    return
+                item_url = f"{client.base_url}/me/drive/items/{folder_ids[parent]}:/{quote(name)}:"
+                source = FileSource(local.path)
+                try:
+                    await upload_source(
+                        client,
+                        f"{item_url}/content",
+                        f"{item_url}/createUploadSession",
+                        source,
+                        conflict_behavior="replace"
+                    )
+                finally:
+                    source.close()
+                report["files_uploaded"] += 1
+                report["bytes_uploaded"] += local.size
+            except GraphError as e:
+                report["failed"].append({"path": local.relative, "error": f"{e.status_code}: {e.text}"})
+            except Exception as e:
+                report["failed"].append({"path": local.relative, "error": str(e)})
+
+        # Largest first, so a big file does not start last and hold up the end of the run
+        queue = iter(sorted(files, key=lambda local: -local.size))
+
+        async def worker() -> None:
+            for local in queue:
+                await upload(local)
+
+        workers = max(1, max_concurrency or BULK_UPLOAD_CONCURRENCY)
+        await asyncio.gather(*(worker() for _ in range(min(workers, len(files)))))
+        if report["files_uploaded"]:
+            invalidate_items(client)
+
+        report["seconds"] = round(time.monotonic() - started, 3)
+        logger.info(
+            f"Directory upload finished: {report['files_uploaded']} uploaded, {report['files_skipped']} skipped, "
+            f"{len(report['failed'])} failed in {report['seconds']}s"
+        )
+        return ("Directory uploaded:", report)
+    except GraphError as e:
+        logger.error(f"Error uploading directory: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception while uploading directory: {e}")
+        return ("Error:", str(e))
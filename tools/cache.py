@@ -0,0 +1,181 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from .base import OneDriveClient, GraphError
+from . import mirror
+from .fields import with_select
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Item metadata and folder listings are cached per token; after CACHE_TTL seconds
+# an entry is revalidated against Graph instead of being fetched again
+CACHE_ENABLED = os.getenv("ONEDRIVE_METADATA_CACHE", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_ENTRIES = int(os.getenv("ONEDRIVE_CACHE_MAX_ENTRIES", "2048"))
+CACHE_TTL = float(os.getenv("ONEDRIVE_CACHE_TTL", "30"))
+# Folder listings older than this are refetched even when the folder eTag still matches
+CACHE_LISTING_MAX_AGE = float(os.getenv("ONEDRIVE_CACHE_LISTING_MAX_AGE", "300"))
+
+# Cache entry kinds; ITEM keys are (item ID, $select) and CHILDREN keys start with
+# (folder ID, $select, ...), so each field projection is cached separately
+ITEM = "item"
+CHILDREN = "children"
+PATH = "path"
+
+CacheKey = Tuple[str, str, Hashable]
+
+
+class CacheEntry:
+    __slots__ = ("value", "tag", "stored_at", "created_at")
+
+    def __init__(self, value: Any, tag: Optional[str]):
+        self.value = value
+        self.tag = tag
+        self.stored_at = time.monotonic()
+        # Not moved by touch(), so revalidation cannot keep an entry alive forever
+        self.created_at = self.stored_at
+
+
+class MetadataCache:
+    """
+    LRU + TTL cache of Graph metadata keyed by (token identity, kind, key).
+
+    Each entry keeps the eTag of the item (or, for listings, of the folder)
+    it was read with, so a stale entry can be revalidated cheaply instead of
+    refetched. Graph does not guarantee that a folder's eTag changes when a
+    child changes, so listings are also refetched once older than
+    listing_max_age, however often they were revalidated.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = CACHE_MAX_ENTRIES,
+            ttl: float = CACHE_TTL,
+            listing_max_age: float = CACHE_LISTING_MAX_AGE
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.listing_max_age = listing_max_age
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token_key: str, kind: str, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get((token_key, kind, key))
+        if entry is not None:
+            self._entries.move_to_end((token_key, kind, key))
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.monotonic() - entry.stored_at < self.ttl
+
+    def put(self, token_key: str, kind: str, key: Hashable, value: Any, tag: Optional[str]) -> None:
+        self._entries[(token_key, kind, key)] = CacheEntry(value, tag)
+        self._entries.move_to_end((token_key, kind, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def within_max_age(self, entry: CacheEntry) -> bool:
+        return time.monotonic() - entry.created_at < self.listing_max_age
+
+    def touch(self, entry: CacheEntry) -> None:
+        entry.stored_at = time.monotonic()
+
+    def invalidate(self, token_key: str, item_ids: Iterable[str] = ()) -> None:
+        """
+        Drop cached metadata for changed items.
+
+        Every listing and path for the token is dropped as well: a change to
+        an item also changes its parent's listing and the paths below it,
+        and callers often do not know the parent's ID or the item's path.
+        """
+        ids = set(item_ids)
+        for cache_key in list(self._entries):
+            token, kind, key = cache_key
+            if token != token_key:
+                continue
+            if kind in (CHILDREN, PATH) or (kind == ITEM and key[0] in ids):
+                del self._entries[cache_key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+metadata_cache = MetadataCache()
+
+
+def log_cache_stats() -> None:
+    """
+    Log how metadata lookups were answered: cache hits, revalidations and misses.
+    """
+    stats = metadata_cache.stats
+    logger.info(
+        f"Metadata cache: {stats['hits']} hits, {stats['revalidated']} revalidated, "
+        f"{stats['misses']} misses, {len(metadata_cache)} entries"
+    )
+
+
+def invalidate_items(client: OneDriveClient, *item_ids: str) -> None:
+    """
+    Invalidate cached metadata after the client changed the given items.
+
+    The client's drive mirror, if any, is marked stale so the next read syncs it.
+    """
+    if CACHE_ENABLED:
+        metadata_cache.invalidate(client.token_key, item_ids)
+    mirror.mark_stale(client)
+
+
+async def get_item_cached(client: OneDriveClient, item_id: str, select: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get a driveItem, served from the cache while fresh.
+
+    A stale entry is revalidated with If-None-Match, so an unchanged item
+    costs a 304 with no body.
+
+    Parameters:
+    - client: OneDrive client to send the request with
+    - item_id: ID of the item
+    - select: $select value (see fields.select_fields); None fetches every field
+
+    Raises:
+    - GraphError if Graph answers with an error status
+    """
+    url = with_select(f"{client.base_url}/me/drive/items/{item_id}", select)
+    entry = metadata_cache.get(client.token_key, ITEM, (item_id, select)) if CACHE_ENABLED else None
+    if entry is not None and metadata_cache.is_fresh(entry):
+        metadata_cache.stats["hits"] += 1
+        return entry.value
+
+    headers = {"If-None-Match": entry.tag} if entry is not None and entry.tag else None
+    response = await client.get(url, headers=headers)
+    if response.status_code == 304 and entry is not None:
+        metadata_cache.stats["revalidated"] += 1
+        metadata_cache.touch(entry)
+        return entry.value
+    if not response.is_success:
+        raise GraphError(response.status_code, response.text)
+
+    item = response.json()
+    if CACHE_ENABLED:
+        metadata_cache.stats["misses"] += 1
+        metadata_cache.put(client.token_key, ITEM, (item_id, select), item, item.get("eTag"))
+    return item
+
+
+async def get_folder_tag(client: OneDriveClient, folder_url: str) -> Optional[str]:
+    """
+    Read the folder eTag a cached listing is revalidated against.
+
+    Graph does not return cTag for folders, and the eTag is not guaranteed
+    to change with every change below the folder; see MetadataCache.
+    """
+    response = await client.get(f"{folder_url}?$select=id,eTag")
+    if not response.is_success:
+        raise GraphError(response.status_code, response.text)
+    return response.json().get("eTag")
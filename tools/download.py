@@ -0,0 +1,276 @@
+import asyncio
+import contextlib
+import logging
+import os
+import tempfile
+import time
+from typing import AsyncIterator, Dict, Any, Iterator, Optional, Tuple
+
+import httpx
+
+from .base import OneDriveClient, GraphError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("ONEDRIVE_DOWNLOAD_CHUNK_SIZE", str(64 * 1024)))
+# Most bytes returned inline by onedrive_read_file_content
+READ_MAX_BYTES = int(os.getenv("ONEDRIVE_READ_MAX_BYTES", str(1024 * 1024)))
+
+# Multi-range downloads: range size, ranges fetched at once, retries per range
+DOWNLOAD_RANGE_SIZE = int(os.getenv("ONEDRIVE_DOWNLOAD_RANGE_SIZE", str(8 * 1024 * 1024)))
+DOWNLOAD_CONCURRENCY = int(os.getenv("ONEDRIVE_DOWNLOAD_CONCURRENCY", "4"))
+DOWNLOAD_MAX_RETRIES = int(os.getenv("ONEDRIVE_DOWNLOAD_MAX_RETRIES", "3"))
+
+
+def range_header(offset: Optional[int], length: Optional[int]) -> Optional[str]:
+    """
+    Build an HTTP Range header value for a byte slice, or None for the whole file.
+    """
+    if not offset and length is None:
+        return None
+    start = offset or 0
+    end = "" if length is None else start + length - 1
+    return f"bytes={start}-{end}"
+
+
+async def iter_download(
+        client: OneDriveClient,
+        url: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        authenticated: bool = True
+) -> AsyncIterator[bytes]:
+    """
+    Stream file content in chunks, optionally limited to a byte range.
+
+    Parameters:
+    - client: OneDrive client to send the request with
+    - url: Graph .../content URL or a pre-authenticated download URL
+    - offset: First byte to read (optional)
+    - length: Number of bytes to read (optional, default to end of file)
+    - authenticated: Set False for pre-authenticated download URLs
+
+    Raises:
+    - GraphError if the download request fails
+    """
+    headers = {}
+    byte_range = range_header(offset, length)
+    if byte_range:
+        headers["Range"] = byte_range
+
+    async with client.stream("GET", url, headers=headers, authenticated=authenticated) as response:
+        if not response.is_success:
+            await response.aread()
+            raise GraphError(response.status_code, response.text)
+
+        # A server that ignores Range answers 200 with the whole file; skip to the slice ourselves
+        skip = (offset or 0) if byte_range and response.status_code == 200 else 0
+        remaining = length
+        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+            if skip:
+                if len(chunk) <= skip:
+                    skip -= len(chunk)
+                    continue
+                chunk = chunk[skip:]
+                skip = 0
+            if remaining is not None:
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            if chunk:
+                yield chunk
+            if remaining == 0:
+                return
+
+
+@contextlib.contextmanager
+def staged_file(local_path: str) -> Iterator[str]:
+    """
+    Yield a temporary path next to local_path, moved over local_path only if the block succeeds.
+
+    An existing file is left untouched by a failed or cancelled download.
+    """
+    fd, part_path = tempfile.mkstemp(
+        dir=os.path.dirname(local_path) or ".", prefix=f".{os.path.basename(local_path)}.", suffix=".part"
+    )
+    os.close(fd)
+    try:
+        yield part_path
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(part_path)
+        raise
+    os.replace(part_path, local_path)
+
+
+async def download_to_file(
+        client: OneDriveClient,
+        url: str,
+        local_path: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        authenticated: bool = True
+) -> int:
+    """
+    Stream file content to a local file, replacing it only once the download completes.
+
+    Returns:
+    - Number of bytes written
+    """
+    written = 0
+    with staged_file(local_path) as part_path, open(part_path, 'wb') as f:
+        async for chunk in iter_download(client, url, offset, length, authenticated=authenticated):
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+async def read_bounded(
+        client: OneDriveClient,
+        url: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        max_bytes: Optional[int] = None
+) -> Tuple[bytes, bool]:
+    """
+    Read at most max_bytes of file content into memory.
+
+    Returns:
+    - Tuple of the bytes read and whether more content was available
+    """
+    limit = READ_MAX_BYTES if max_bytes is None else max_bytes
+    if limit < 1:
+        raise ValueError("max_bytes must be at least 1")
+    if length is not None and length <= limit:
+        limit = length
+        want = length
+    else:
+        # Ask for one extra byte to learn whether the content goes on
+        want = None if length is None else limit + 1
+
+    chunks = []
+    received = 0
+    async with contextlib.aclosing(iter_download(client, url, offset, want)) as stream:
+        async for chunk in stream:
+            chunks.append(chunk)
+            received += len(chunk)
+            if received > limit:
+                break
+
+    data = b"".join(chunks)
+    return data[:limit], len(data) > limit
+
+
+async def resolve_download_url(client: OneDriveClient, item_url: str) -> Tuple[str, int]:
+    """
+    Look up the pre-authenticated download URL and size of a file.
+
+    Parameters:
+    - client: OneDrive client to send the request with
+    - item_url: Graph URL of the driveItem
+
+    Returns:
+    - Tuple of the @microsoft.graph.downloadUrl and the file size in bytes
+    """
+    response = await client.get(f"{item_url}?$select=id,size,@microsoft.graph.downloadUrl")
+    if not response.is_success:
+        raise GraphError(response.status_code, response.text)
+    item = response.json()
+    if "@microsoft.graph.downloadUrl" not in item:
+        raise GraphError(400, "Item has no download URL (is it a folder?)")
+    return item["@microsoft.graph.downloadUrl"], item.get("size", 0)
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, GraphError) and (error.status_code in (408, 429) or error.status_code >= 500)
+
+
+async def _download_range(
+        client: OneDriveClient,
+        download_url: str,
+        local_path: str,
+        start: int,
+        length: int
+) -> int:
+    """
+    Download one byte range into its place in a preallocated file.
+
+    A failed range is retried from the last byte written.
+    """
+    done = 0
+    attempts = 0
+    with open(local_path, 'r+b') as f:
+        f.seek(start)
+        while done < length:
+            try:
+                async for chunk in iter_download(
+                        client, download_url, start + done, length - done, authenticated=False
+                ):
+                    f.write(chunk)
+                    done += len(chunk)
+            except Exception as e:
+                attempts += 1
+                if attempts > DOWNLOAD_MAX_RETRIES or not _is_transient(e):
+                    raise
+                logger.warning(f"Range at byte {start + done} failed ({e}); retry {attempts}/{DOWNLOAD_MAX_RETRIES}")
+                await asyncio.sleep(min(2 ** attempts, 30))
+    return done
+
+
+async def parallel_download(
+        client: OneDriveClient,
+        download_url: str,
+        size: int,
+        local_path: str,
+        range_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Download a file as concurrent byte ranges written at their offsets.
+
+    A temporary file next to local_path is preallocated to the full size
+    and each range writes into its own slice, so no reassembly step is
+    needed; it replaces local_path only when every range has completed.
+
+    Parameters:
+    - client: OneDrive client whose connection pool is used
+    - download_url: Pre-authenticated download URL
+    - size: File size in bytes
+    - local_path: Destination file
+    - range_size: Bytes per range (default ONEDRIVE_DOWNLOAD_RANGE_SIZE)
+    - concurrency: Ranges downloaded at once (default ONEDRIVE_DOWNLOAD_CONCURRENCY)
+
+    Returns:
+    - Dictionary with bytes, ranges, seconds and bytes_per_second
+    """
+    range_size = max(1, range_size or DOWNLOAD_RANGE_SIZE)
+    semaphore = asyncio.Semaphore(max(1, concurrency or DOWNLOAD_CONCURRENCY))
+    ranges = [(start, min(range_size, size - start)) for start in range(0, size, range_size)]
+    started = time.monotonic()
+
+    with staged_file(local_path) as part_path:
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+
+        async def fetch(start: int, length: int) -> int:
+            async with semaphore:
+                return await _download_range(client, download_url, part_path, start, length)
+
+        tasks = [asyncio.create_task(fetch(start, length)) for start, length in ranges]
+        try:
+            written = sum(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    elapsed = time.monotonic() - started
+    return {
+        "bytes": written,
+        "ranges": len(ranges),
+        "seconds": round(elapsed, 3),
+        "bytes_per_second": int(written / elapsed) if elapsed > 0 else written
+    }
@@ -0,0 +1,66 @@
+import re
+from typing import Any, Dict, Optional
+
+# Field projection for metadata and listing tools, sent to Graph as $select.
+# "compact" covers what agents use to identify and navigate items; eTag is
+# kept so cached items and folder listings can still be revalidated.
+COMPACT_FIELDS = (
+    "id", "name", "size", "lastModifiedDateTime", "webUrl", "eTag", "cTag",
+    "parentReference", "file", "folder", "package", "root", "remoteItem",
+)
+# Always selected, whatever the caller asks for
+REQUIRED_FIELDS = ("id", "name", "eTag")
+
+# driveItem property names; anything else could add parameters to the Graph URL
+_FIELD_NAME = re.compile(r"^[A-Za-z0-9@._]+$")
+
+FULL = "full"
+COMPACT = "compact"
+
+
+def select_fields(fields: Optional[str] = None) -> Optional[str]:
+    """
+    Turn a tool's `fields` argument into a $select value.
+
+    Parameters:
+    - fields: "compact" (default), "full", or a comma-separated list of driveItem fields
+
+    Returns:
+    - Canonical $select value (sorted, so equal projections share cache entries),
+      or None for "full"
+
+    Raises:
+    - ValueError if a field name contains anything but letters, digits, "@", "." and "_"
+    """
+    fields = (fields or COMPACT).strip()
+    if fields.lower() == FULL:
+        return None
+    if fields.lower() == COMPACT:
+        names = set(COMPACT_FIELDS)
+    else:
+        names = {name.strip() for name in fields.split(",") if name.strip()}
+        invalid = sorted(name for name in names if not _FIELD_NAME.match(name))
+        if invalid:
+            raise ValueError(f"Invalid field names: {', '.join(invalid)}")
+    return ",".join(sorted(names | set(REQUIRED_FIELDS)))
+
+
+COMPACT_SELECT = select_fields(COMPACT)
+
+
+def with_select(url: str, select: Optional[str]) -> str:
+    """
+    Add $select to a Graph URL (unchanged when select is None).
+    """
+    if select is None:
+        return url
+    return f"{url}{'&' if '?' in url else '?'}$select={select}"
+
+
+def project_item(item: Dict[str, Any], select: Optional[str]) -> Dict[str, Any]:
+    """
+    Apply a $select value to an item held locally (drive mirror), like Graph would.
+    """
+    if select is None:
+        return item
+    return {name: item[name] for name in select.split(",") if name in item}
@@ -1,24 +1,84 @@
-import requests
+import base64
+import codecs
 import logging
-import os
-from typing import Tuple, Union, Dict, Any
-from .base import get_onedrive_client
-from .search_n_list import onedrive_list_inside_folder
-import uuid
+from typing import Tuple, Union, Dict, Any, Optional
+from urllib.parse import quote
+from .base import get_onedrive_client, OneDriveClient, GraphError
+from .upload import upload_source, log_progress, BytesSource, FileSource
+from .cache import invalidate_items
+from .paths import resolve_item_id
+from .local_files import confine_local_path, LocalPathError
+from .download import download_to_file, read_bounded, resolve_download_url, parallel_download, DOWNLOAD_RANGE_SIZE
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
-async def onedrive_read_file_content(file_id: str) -> Union[str, Tuple[str, int, str]]:
+# if_exists option -> @microsoft.graph.conflictBehavior
+_CONFLICT_BEHAVIORS = {'error': 'fail', 'rename': 'rename', 'replace': 'replace'}
+
+
+async def _upload_item(
+        client: OneDriveClient,
+        item_url: str,
+        name: str,
+        data: Optional[str],
+        source_path: Optional[str],
+        conflict_behavior: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Upload text data or a local file to an item address.
+
+    source_path must lie inside ONEDRIVE_LOCAL_ROOT (LocalPathError otherwise).
+    Session uploads attach their throughput metrics to the returned item as "uploadMetrics".
+    """
+    if source_path:
+        source = FileSource(confine_local_path(source_path))
+    else:
+        source = BytesSource((data or '').encode('utf-8'))
+    try:
+        item, metrics = await upload_source(
+            client,
+            f"{item_url}/content",
+            f"{item_url}/createUploadSession",
+            source,
+            conflict_behavior=conflict_behavior,
+            progress=log_progress(name)
+        )
+    finally:
+        source.close()
+
+    invalidate_items(client, item.get("id"))
+    if metrics["fragments"] > 1:
+        item["uploadMetrics"] = metrics
+    return item
+
+
+async def onedrive_read_file_content(
+        file_id: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        local_path: Optional[str] = None,
+        max_bytes: Optional[int] = None
+) -> Union[str, Dict[str, Any], Tuple[str, int, str]]:
     """
     Read the content of a file from OneDrive.
 
+    Content is streamed, so memory use stays flat regardless of file size.
+
     Parameters:
     - file_id: The ID of the file to read
+    - offset: First byte to read (optional)
+    - length: Number of bytes to read (optional, default to end of file)
+    - local_path: Write the content to this local file instead of returning it,
+                  inside ONEDRIVE_LOCAL_ROOT (optional)
+    - max_bytes: Most bytes to return inline (optional, default ONEDRIVE_READ_MAX_BYTES)
 
     Returns:
-    - The file content as string if successful
+    - The file content as string when the whole file is text and fits in max_bytes
+    - Otherwise a dictionary with the content ('utf-8' text or 'base64' for binary),
+      the byte range returned and whether the content was truncated
+    - With local_path: Tuple with success message and download details
     - Tuple with error message, status code, and response text if failed
     """
     client = get_onedrive_client()
@@ -26,30 +86,162 @@ async def onedrive_read_file_content(file_id: str) -> Union[str, Tuple[str, int,
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/items/{file_id}/content"
+    if offset is not None and offset < 0 or length is not None and length < 1 or max_bytes is not None and max_bytes < 1:
+        logger.error(f"Invalid byte range: offset={offset}, length={length}, max_bytes={max_bytes}")
+        return ("Invalid byte range: offset must not be negative, length and max_bytes must be at least 1.",)
+
+    url = f"{client.base_url}/me/drive/items/{file_id}/content"
+
+    if local_path:
+        try:
+            local_path = confine_local_path(local_path)
+        except LocalPathError as e:
+            logger.error(f"Rejected local path: {e}")
+            return ("Error:", str(e))
+
+    if local_path and offset is None and length is None:
+        return await onedrive_download_file(file_id, local_path)
 
     try:
+        if local_path:
+            logger.info(f"Downloading file ID {file_id} to {local_path}")
+            written = await download_to_file(client, url, local_path, offset, length)
+            logger.info(f"Successfully downloaded {written} bytes of file ID: {file_id}")
+            return ("File downloaded:", {"path": local_path, "bytes": written})
+
         logger.info(f"Reading content of file ID: {file_id}")
-        response = requests.get(url, headers=client['headers'])
+        data, truncated = await read_bounded(client, url, offset, length, max_bytes)
+        logger.info(f"Successfully read {len(data)} bytes of file ID: {file_id}")
+
+        try:
+            # A truncated read may end inside a multi-byte character; those bytes are
+            # left for the next page, so offsets never split a character
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            content, encoding = decoder.decode(data, final=not truncated), 'utf-8'
+            consumed = len(data) - len(decoder.getstate()[0])
+            if data and not consumed:
+                # max_bytes is smaller than one character; return the bytes so paging still advances
+                raise UnicodeDecodeError('utf-8', data, 0, len(data), 'incomplete character')
+        except UnicodeDecodeError:
+            content, encoding = base64.b64encode(data).decode('ascii'), 'base64'
+            consumed = len(data)
+
+        if encoding == 'utf-8' and not truncated and not offset and length is None:
+            return content
+
+        start = offset or 0
+        return {
+            "content": content,
+            "encoding": encoding,
+            "offset": start,
+            "bytes": consumed,
+            "truncated": truncated,
+            "next_offset": start + consumed
+        }
+    except GraphError as e:
+        logger.error(f"Error reading file {file_id}: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception occurred while reading file content: {e}")
+        return ("Error:", str(e))
+
+
+async def onedrive_read_file_content_by_path(
+        path: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        local_path: Optional[str] = None,
+        max_bytes: Optional[int] = None
+) -> Union[str, Dict[str, Any], Tuple[str, int, str]]:
+    """
+    Read the content of a file given by its path from the drive root.
+
+    Parameters:
+    - path: Path of the file, e.g. "/Reports/2026/q3.csv"
+    - offset, length, local_path, max_bytes: As for onedrive_read_file_content
+
+    Returns:
+    - Same as onedrive_read_file_content
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    try:
+        file_id = await resolve_item_id(client, path)
+    except GraphError as e:
+        logger.error(f"Error resolving path {path}: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception occurred while resolving path: {e}")
+        return ("Error:", str(e))
 
-        if response.ok:
-            logger.info(f"Successfully read content of file ID: {file_id}")
-            return response.text
+    return await onedrive_read_file_content(file_id, offset, length, local_path, max_bytes)
+
+
+async def onedrive_download_file(
+        file_id: str,
+        local_path: str,
+        range_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None
+) -> Tuple[str, Any]:
+    """
+    Download a file from OneDrive to a local path.
+
+    Large files are fetched as several byte ranges at once from the item's
+    pre-authenticated download URL; each range is written at its offset in
+    the local file and retried on its own if the connection drops.
+
+    Parameters:
+    - file_id: The ID of the file to download
+    - local_path: Server file to write, inside ONEDRIVE_LOCAL_ROOT; replaced only after a complete download
+    - range_size: Bytes per range (optional, default ONEDRIVE_DOWNLOAD_RANGE_SIZE)
+    - max_concurrency: Ranges downloaded at once (optional, default ONEDRIVE_DOWNLOAD_CONCURRENCY)
+
+    Returns:
+    - Tuple with success message and download details if successful
+    - Tuple with error message, status code, and response text if failed
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    try:
+        local_path = confine_local_path(local_path)
+        logger.info(f"Downloading file ID {file_id} to {local_path}")
+        download_url, size = await resolve_download_url(client, f"{client.base_url}/me/drive/items/{file_id}")
+
+        if size <= (range_size or DOWNLOAD_RANGE_SIZE) or max_concurrency == 1:
+            written = await download_to_file(client, download_url, local_path, authenticated=False)
+            details = {"path": local_path, "bytes": written, "ranges": 1}
         else:
-            logger.error(f"Error reading file {file_id}: {response.status_code} - {response.text}")
-            return ("Error:", response.status_code, response.text)
+            metrics = await parallel_download(client, download_url, size, local_path, range_size, max_concurrency)
+            details = {"path": local_path, **metrics}
+
+        logger.info(f"Successfully downloaded {details['bytes']} bytes of file ID: {file_id}")
+        return ("File downloaded:", details)
+    except GraphError as e:
+        logger.error(f"Error downloading file {file_id}: {e}")
+        return ("Error:", e.status_code, e.text)
     except Exception as e:
-        logger.error(f"Exception occurred while reading file content: {e}")
+        logger.error(f"Exception occurred while downloading file: {e}")
         return ("Error:", str(e))
 
 
-async def onedrive_overwrite_file_by_id(file_id: str, new_content: str) -> Union[Tuple[str, Dict], Tuple[str, int, str]]:
+async def onedrive_overwrite_file_by_id(
+        file_id: str,
+        new_content: Optional[str] = None,
+        source_path: Optional[str] = None
+) -> Union[Tuple[str, Dict], Tuple[str, int, str]]:
     """
     Overwrite the content of an existing file in OneDrive.
 
     Parameters:
     - file_id: The ID of the file to overwrite
     - new_content: The new content to write to the file
+    - source_path: Server file to upload instead of new_content, inside ONEDRIVE_LOCAL_ROOT (optional)
 
     Returns:
     - Tuple with success message and response JSON if successful
@@ -60,18 +252,20 @@ async def onedrive_overwrite_file_by_id(file_id: str, new_content: str) -> Union
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/items/{file_id}/content"
+    if new_content is None and not source_path:
+        logger.error("Neither new_content nor source_path given")
+        return ("Either new_content or source_path is required.",)
+
+    url = f"{client.base_url}/me/drive/items/{file_id}"
 
     try:
         logger.info(f"Overwriting content of file ID: {file_id}")
-        response = requests.put(url, headers=client['headers'], data=new_content.encode('utf-8'))
-
-        if response.ok:
-            logger.info(f"Successfully overwrote file ID: {file_id}")
-            return ("File overwritten successfully:", response.json())
-        else:
-            logger.error(f"Error overwriting file {file_id}: {response.status_code} - {response.text}")
-            return ("Error:", response.status_code, response.text)
+        item = await _upload_item(client, url, file_id, new_content, source_path)
+        logger.info(f"Successfully overwrote file ID: {file_id}")
+        return ("File overwritten successfully:", item)
+    except GraphError as e:
+        logger.error(f"Error overwriting file {file_id}: {e}")
+        return ("Error:", e.status_code, e.text)
     except Exception as e:
         logger.error(f"Exception occurred while overwriting file: {e}")
         return ("Error:", str(e))
@@ -81,7 +275,8 @@ async def onedrive_create_file(
         parent_folder_id: str,
         new_file_name: str,
         data: str = None,
-        if_exists: str = 'error'
+        if_exists: str = 'error',
+        source_path: Optional[str] = None
 ) -> Union[Tuple[str, Dict], Tuple[str]]:
     """
     Create a new file in a specific OneDrive folder.
@@ -91,6 +286,7 @@ async def onedrive_create_file(
     - new_file_name: Name for the new file
     - data: Content for the new file (optional)
     - if_exists: Behavior when file exists ('error', 'rename', or 'replace')
+    - source_path: Server file to upload instead of data, inside ONEDRIVE_LOCAL_ROOT (optional)
 
     Returns:
     - Tuple with success message and response JSON if successful
@@ -104,43 +300,25 @@ async def onedrive_create_file(
     try:
         logger.info(f"Creating file '{new_file_name}' in folder {parent_folder_id} with if_exists={if_exists}")
 
-        # Step 1: list files/folders inside parent folder
-        result = await onedrive_list_inside_folder(parent_folder_id)
-
-        if not result or len(result) < 2:
-            logger.error(f"Could not list contents of folder {parent_folder_id}")
-            return ("Could not list folder contents",)
-
-        _, existing_items = result
-
-        existing_names = [item['name'] for item in existing_items.get('value', [])]
-
-        # Step 2: handle existing file
-        final_name = new_file_name
-        if new_file_name in existing_names:
-            if if_exists == 'error':
+        conflict_behavior = _CONFLICT_BEHAVIORS.get(if_exists)
+        if conflict_behavior is None:
+            logger.error(f"Invalid if_exists option: {if_exists}")
+            return ("Invalid if_exists option.",)
+
+        # Graph applies the conflict behavior, so no listing of the parent is needed
+        url = f"{client.base_url}/me/drive/items/{parent_folder_id}:/{quote(new_file_name)}:"
+        try:
+            item = await _upload_item(client, url, new_file_name, data, source_path, conflict_behavior)
+        except GraphError as e:
+            if e.status_code == 409 and conflict_behavior == 'fail':
                 logger.warning(f"File '{new_file_name}' already exists in folder {parent_folder_id}")
                 return (f"File '{new_file_name}' already exists. Aborting.",)
-            elif if_exists == 'rename':
-                name, ext = os.path.splitext(new_file_name)
-                final_name = f"{name}_{uuid.uuid4().hex}{ext}"
-                logger.info(f"Renaming file to '{final_name}' due to naming conflict")
-            elif if_exists == 'replace':
-                logger.info(f"File exists, will replace '{new_file_name}'")
-            else:
-                logger.error(f"Invalid if_exists option: {if_exists}")
-                return ("Invalid if_exists option.",)
-
-        # Step 3: create the file
-        url = f"{client['base_url']}/me/drive/items/{parent_folder_id}:/{final_name}:/content"
-        put_response = requests.put(url, headers=client['headers'], data=data or '')
-
-        if put_response.ok:
-            logger.info(f"Successfully created file '{final_name}' in folder {parent_folder_id}")
-            return ("File created:", put_response.json())
-        else:
-            logger.error(f"Error creating file: {put_response.status_code} - {put_response.text}")
-            return ("Error creating file:", put_response.status_code, put_response.text)
+            logger.error(f"Error creating file: {e}")
+            return ("Error creating file:", e.status_code, e.text)
+
+        final_name = item.get('name', new_file_name)
+        logger.info(f"Successfully created file '{final_name}' in folder {parent_folder_id}")
+        return ("File created:", item)
     except Exception as e:
         logger.error(f"Exception occurred while creating file: {e}")
         return ("Error:", str(e))
@@ -149,7 +327,8 @@ async def onedrive_create_file(
 async def onedrive_create_file_in_root(
         new_file_name: str,
         data: str = None,
-        if_exists: str = 'error'
+        if_exists: str = 'error',
+        source_path: Optional[str] = None
 ) -> Union[Tuple[str, Dict], Tuple[str, int, str]]:
     """
     Create a new file in the root of OneDrive.
@@ -158,6 +337,7 @@ async def onedrive_create_file_in_root(
     - new_file_name: Name for the new file
     - data: Content for the new file (optional)
     - if_exists: Behavior when file exists ('error', 'rename', or 'replace')
+    - source_path: Server file to upload instead of data, inside ONEDRIVE_LOCAL_ROOT (optional)
 
     Returns:
     - Tuple with success message and response JSON if successful
@@ -171,45 +351,25 @@ async def onedrive_create_file_in_root(
     try:
         logger.info(f"Creating file '{new_file_name}' in root with if_exists={if_exists}")
 
-        # Step 1: list files/folders in root
-        existing_items_resp = requests.get(
-            f"{client['base_url']}/me/drive/root/children",
-            headers=client['headers']
-        )
-        if not existing_items_resp.ok:
-            logger.error(
-                f"Could not list root contents: {existing_items_resp.status_code} - {existing_items_resp.text}")
-            return ("Could not list root contents:", existing_items_resp.status_code, existing_items_resp.text)
-
-        existing_items = existing_items_resp.json().get('value', [])
-        existing_names = [item['name'] for item in existing_items]
-
-        # Step 2: handle existing file
-        final_name = new_file_name
-        if new_file_name in existing_names:
-            if if_exists == 'error':
+        conflict_behavior = _CONFLICT_BEHAVIORS.get(if_exists)
+        if conflict_behavior is None:
+            logger.error(f"Invalid if_exists option: {if_exists}")
+            return ("Invalid if_exists option.",)
+
+        # Graph applies the conflict behavior, so no listing of the root is needed
+        url = f"{client.base_url}/me/drive/root:/{quote(new_file_name)}:"
+        try:
+            item = await _upload_item(client, url, new_file_name, data, source_path, conflict_behavior)
+        except GraphError as e:
+            if e.status_code == 409 and conflict_behavior == 'fail':
                 logger.warning(f"File '{new_file_name}' already exists in root")
                 return (f"File '{new_file_name}' already exists. Aborting.",)
-            elif if_exists == 'rename':
-                name, ext = os.path.splitext(new_file_name)
-                final_name = f"{name}_{uuid.uuid4().hex}{ext}"
-                logger.info(f"Renaming file to '{final_name}' due to naming conflict")
-            elif if_exists == 'replace':
-                logger.info(f"File exists, will replace '{new_file_name}'")
-            else:
-                logger.error(f"Invalid if_exists option: {if_exists}")
-                return ("Invalid if_exists option.",)
-
-        # Step 3: create the file
-        url = f"{client['base_url']}/me/drive/root:/{final_name}:/content"
-        put_response = requests.put(url, headers=client['headers'], data=data or '')
-
-        if put_response.ok:
-            logger.info(f"Successfully created file '{final_name}' in root")
-            return ("File created:", put_response.json())
-        else:
-            logger.error(f"Error creating file: {put_response.status_code} - {put_response.text}")
-            return ("Error creating file:", put_response.status_code, put_response.text)
+            logger.error(f"Error creating file: {e}")
+            return ("Error creating file:", e.status_code, e.text)
+
+        final_name = item.get('name', new_file_name)
+        logger.info(f"Successfully created file '{final_name}' in root")
+        return ("File created:", item)
     except Exception as e:
         logger.error(f"Exception occurred while creating file in root: {e}")
         return ("Error:", str(e))
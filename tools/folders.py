@@ -1,7 +1,7 @@
-import requests
 import logging
 from typing import Tuple, Union, Dict, Any
 from .base import get_onedrive_client
+from .cache import invalidate_items
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -29,7 +29,7 @@ async def onedrive_create_folder(
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/items/{parent_folder_id}/children"
+    url = f"{client.base_url}/me/drive/items/{parent_folder_id}/children"
     data = {
         "name": new_folder_name,
         "folder": {},
@@ -38,13 +38,14 @@ async def onedrive_create_folder(
 
     try:
         logger.info(f"Creating folder '{new_folder_name}' in parent {parent_folder_id} with behavior={behavior}")
-        response = requests.post(
+        response = await client.post(
             url,
-            headers={**client['headers'], "Content-Type": "application/json"},
+            headers={"Content-Type": "application/json"},
             json=data
         )
 
-        if response.ok:
+        if response.is_success:
+            invalidate_items(client, parent_folder_id)
             logger.info(f"Successfully created folder '{new_folder_name}' in {parent_folder_id}")
             return ("Folder created successfully:", response.json())
         else:
@@ -73,7 +74,7 @@ async def onedrive_create_folder_in_root(
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/root/children"
+    url = f"{client.base_url}/me/drive/root/children"
     body = {
         "name": folder_name,
         "folder": {},
@@ -82,13 +83,10 @@ async def onedrive_create_folder_in_root(
 
     try:
         logger.info(f"Creating folder '{folder_name}' in root directory")
-        response = requests.post(
-            url,
-            headers=client['headers'],
-            json=body
-        )
+        response = await client.post(url, json=body)
 
-        if response.ok:
+        if response.is_success:
+            invalidate_items(client)
             logger.info(f"Successfully created folder '{folder_name}' in root")
             return response.json()
         else:
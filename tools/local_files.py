@@ -0,0 +1,36 @@
+import os
+
+# Directory on the server that local_path / source_path / local_dir arguments are confined to.
+# Empty (the default) disables every tool parameter that reads or writes server files.
+LOCAL_ROOT = os.getenv("ONEDRIVE_LOCAL_ROOT", "")
+
+
+class LocalPathError(ValueError):
+    """
+    Raised when a tool is given a server path outside ONEDRIVE_LOCAL_ROOT, or local file access is disabled.
+    """
+
+
+def confine_local_path(path: str) -> str:
+    """
+    Resolve a caller-supplied server path inside ONEDRIVE_LOCAL_ROOT.
+
+    Relative paths are taken relative to the root. Symlinks are resolved
+    before the check, so a link inside the root cannot point outside it.
+
+    Parameters:
+    - path: Path given by the MCP caller
+
+    Returns:
+    - Absolute, resolved path inside the root
+
+    Raises:
+    - LocalPathError if local file access is disabled or the path leaves the root
+    """
+    if not LOCAL_ROOT:
+        raise LocalPathError("Local file access is disabled; set ONEDRIVE_LOCAL_ROOT to enable it")
+    root = os.path.realpath(LOCAL_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise LocalPathError(f"Local path '{path}' is outside ONEDRIVE_LOCAL_ROOT")
+    return resolved
@@ -0,0 +1,424 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .base import OneDriveClient, GraphError, _running_loop
+from .store import MIRROR_DB_DIR, open_drive_store, close_drive_stores
+from .search_index import NameIndex
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Opt-in: answer listings and name searches from a local copy of the drive tree
+MIRROR_ENABLED = os.getenv("ONEDRIVE_MIRROR", "false").lower() in ("1", "true", "yes")
+# Reads within this many seconds of the last delta sync do not call Graph
+MIRROR_SYNC_INTERVAL = float(os.getenv("ONEDRIVE_MIRROR_SYNC_INTERVAL", "30"))
+
+DELTA_LINK = "delta_link"
+ROOT_ID = "root_id"
+
+
+class MemoryStore:
+    """
+    In-memory item store for a DriveMirror, with a parent -> children index.
+    """
+
+    def __init__(self):
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._children: Dict[str, Set[str]] = {}
+        self._meta: Dict[str, str] = {}
+        # Name index shared by every mirror using this store, kept current by DriveMirror.sync
+        self.index: Optional[NameIndex] = None
+        # Runs every DriveMirror operation on this store, one at a time, off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="drive-store")
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        return self._items.get(item_id)
+
+    def put(self, item: Dict[str, Any]) -> None:
+        item_id = item["id"]
+        old = self._items.get(item_id)
+        old_parent = _parent_id(old) if old else None
+        new_parent = _parent_id(item)
+        if old_parent != new_parent and old_parent in self._children:
+            self._children[old_parent].discard(item_id)
+        if new_parent:
+            self._children.setdefault(new_parent, set()).add(item_id)
+        self._items[item_id] = item
+
+    def delete(self, item_id: str) -> None:
+        item = self._items.pop(item_id, None)
+        if item is not None:
+            parent = _parent_id(item)
+            if parent in self._children:
+                self._children[parent].discard(item_id)
+        self._children.pop(item_id, None)
+
+    def children(self, parent_id: str) -> List[Dict[str, Any]]:
+        return [self._items[child] for child in self._children.get(parent_id, ()) if child in self._items]
+
+    def find_child(self, parent_id: str, name: str) -> Optional[Dict[str, Any]]:
+        wanted = name.lower()
+        return next((child for child in self.children(parent_id) if child.get("name", "").lower() == wanted), None)
+
+    def items(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._items.values()))
+
+    def get_meta(self, key: str) -> Optional[str]:
+        return self._meta.get(key)
+
+    def set_meta(self, key: str, value: Optional[str]) -> None:
+        if value is None:
+            self._meta.pop(key, None)
+        else:
+            self._meta[key] = value
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        yield
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._children.clear()
+        self._meta.clear()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+def _parent_id(item: Dict[str, Any]) -> Optional[str]:
+    return (item.get("parentReference") or {}).get("id")
+
+
+class DriveMirror:
+    """
+    Local copy of a user's drive tree kept current with the Graph delta API.
+
+    The first sync enumerates the drive through /me/drive/root/delta; later
+    syncs follow the stored deltaLink and apply only changed and deleted
+    items. If Graph expires the delta token (410 Gone) the mirror is
+    rebuilt from scratch.
+
+    There is one mirror per drive, whichever token reads it. With a SQLite
+    store a restarted server resumes from the saved delta token instead of
+    enumerating the drive again.
+
+    Store and index work (queries, decoding rows, applying delta pages,
+    building the name index) runs on the store's single worker thread, so
+    it never blocks the event loop and never overlaps. The underscore
+    methods run there; the async methods are the ones to call from tools.
+    """
+
+    def __init__(self, drive_id: str, store):
+        self.drive_id = drive_id
+        self.store = store
+        self.last_sync: Optional[float] = None
+        self.stale = True
+        # Whether the store holds a delta token, known after the first sync
+        self.is_ready = False
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _sync_lock(self) -> asyncio.Lock:
+        # asyncio locks are bound to the loop they are first used on
+        loop = _running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.store.executor, functools.partial(fn, *args))
+
+    @property
+    def root_id(self) -> Optional[str]:
+        return self.store.get_meta(ROOT_ID)
+
+    def mark_stale(self) -> None:
+        self.stale = True
+
+    def needs_sync(self) -> bool:
+        if self.stale or self.last_sync is None or not self.is_ready:
+            return True
+        return time.monotonic() - self.last_sync >= MIRROR_SYNC_INTERVAL
+
+    async def ensure_synced(self, client: OneDriveClient) -> None:
+        """
+        Sync if the mirror is stale or older than ONEDRIVE_MIRROR_SYNC_INTERVAL.
+        """
+        if self.needs_sync():
+            async with self._sync_lock():
+                # Another caller may have synced while this one waited
+                if self.needs_sync():
+                    await self.sync(client)
+
+    async def sync(self, client: OneDriveClient) -> Dict[str, Any]:
+        """
+        Apply all changes since the last sync (or enumerate the drive on the first sync).
+
+        Returns:
+        - Dictionary with the number of changed and deleted items and whether a full sync ran
+
+        Raises:
+        - GraphError if Graph answers with an error status
+        """
+        started = time.monotonic()
+        stats = {"changed": 0, "deleted": 0, "full": False}
+        url = await self._run(self.store.get_meta, DELTA_LINK)
+        if url is None:
+            url = f"{client.base_url}/me/drive/root/delta"
+            stats["full"] = True
+            await self._run(self._clear)
+
+        while url:
+            response = await client.get(url)
+            if response.status_code == 410 and not stats["full"]:
+                logger.warning("Delta token expired; rebuilding drive mirror")
+                await self._run(self._clear)
+                url = f"{client.base_url}/me/drive/root/delta"
+                stats = {"changed": 0, "deleted": 0, "full": True}
+                continue
+            if not response.is_success:
+                raise GraphError(response.status_code, response.text)
+
+            data = response.json()
+            url = data.get("@odata.nextLink")
+            await self._run(self._apply_page, data, url is None, stats)
+
+        count, self.is_ready = await self._run(self._summary)
+        self.last_sync = time.monotonic()
+        self.stale = False
+        stats["seconds"] = round(self.last_sync - started, 3)
+        logger.info(
+            f"Drive mirror synced: {stats['changed']} changed, {stats['deleted']} deleted, "
+            f"{count} items ({'full' if stats['full'] else 'incremental'}, {stats['seconds']}s)"
+        )
+        return stats
+
+    def _apply_page(self, data: Dict[str, Any], last: bool, stats: Dict[str, Any]) -> None:
+        # A page's items and the final delta token are saved together
+        with self.store.transaction():
+            for item in data.get("value", []):
+                if "deleted" in item:
+                    self._delete_tree(item["id"])
+                    stats["deleted"] += 1
+                else:
+                    self.store.put(item)
+                    if self.store.index is not None:
+                        self.store.index.add(item)
+                    if "root" in item:
+                        self.store.set_meta(ROOT_ID, item["id"])
+                    stats["changed"] += 1
+            if last:
+                self.store.set_meta(DELTA_LINK, data.get("@odata.deltaLink"))
+
+    def _summary(self) -> Tuple[int, bool]:
+        # A store resumed from disk gets its index once here; from then on
+        # _apply_page keeps it current, so searches never rebuild it
+        if self.store.index is None:
+            self.store.index = NameIndex()
+            self.store.index.rebuild(self.store.items())
+        return len(self.store), self.store.get_meta(DELTA_LINK) is not None
+
+    def _clear(self) -> None:
+        self.store.clear()
+        # A full enumeration fills the index item by item as pages arrive
+        if self.store.index is None:
+            self.store.index = NameIndex()
+        else:
+            self.store.index.clear()
+
+    def _delete_tree(self, item_id: str) -> None:
+        # Delta may report only the deleted folder, not each descendant
+        pending = [item_id]
+        while pending:
+            current = pending.pop()
+            pending.extend(child["id"] for child in self.store.children(current))
+            self.store.delete(current)
+            if self.store.index is not None:
+                self.store.index.remove(current)
+
+    def _get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(self.root_id if item_id == "root" else item_id)
+
+    async def children(self, folder_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return a folder's children sorted by name, or None if the folder is not mirrored.
+        """
+        return await self._run(self._children, folder_id)
+
+    def _children(self, folder_id: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        folder = self._get(folder_id or "root")
+        if folder is None or "folder" not in folder and "root" not in folder:
+            return None
+        return sorted(self.store.children(folder["id"]), key=lambda item: item.get("name", "").lower())
+
+    def _path_of(self, item_id: str) -> Optional[str]:
+        """
+        Build an item's path from the root ("/" for the root itself).
+        """
+        names = []
+        item = self._get(item_id)
+        while item is not None and "root" not in item:
+            names.append(item.get("name", ""))
+            item = self.store.get(_parent_id(item) or "")
+        if item is None:
+            return None
+        return "/" + "/".join(reversed(names))
+
+    async def resolve_path(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Find an item by its path from the root, matching names case-insensitively like OneDrive.
+        """
+        return await self._run(self._resolve_path, path)
+
+    def _resolve_path(self, path: str) -> Optional[Dict[str, Any]]:
+        item = self._get("root")
+        for name in (part for part in path.strip("/").split("/") if part):
+            if item is None:
+                return None
+            item = self.store.find_child(item["id"], name)
+        return item
+
+    async def search(
+            self,
+            query: str,
+            folders_only: bool = False,
+            files_only: bool = False,
+            limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search item names through the local name index, best match first.
+
+        A query containing "/" matches the last segment against names and
+        requires the earlier segments to appear in the item's path, so
+        "reports/q3" finds "Q3 summary.xlsx" under a Reports folder.
+        """
+        return await self._run(self._search, query, folders_only, files_only, limit)
+
+    def _search(
+            self,
+            query: str,
+            folders_only: bool,
+            files_only: bool,
+            limit: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        # The index lives on the store and every sync updates it (see _summary)
+        *folders, name = query.lower().strip("/").split("/")
+        ranked = self.store.index.search(
+            name,
+            folders_only=folders_only,
+            files_only=files_only,
+            limit=None if folders else limit
+        )
+
+        results = []
+        for item_id, _ in ranked:
+            if folders:
+                path = (self._path_of(item_id) or "").lower()
+                if not all(folder in path for folder in folders):
+                    continue
+            item = self.store.get(item_id)
+            if item is not None:
+                results.append(item)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+
+# drive ID -> mirror
+_mirrors: Dict[str, DriveMirror] = {}
+
+
+async def get_mirror(client: OneDriveClient) -> DriveMirror:
+    """
+    Return the mirror of the client's drive, creating an empty one if needed.
+
+    Mirrors are keyed by drive ID rather than token, so a refreshed access
+    token keeps using the mirror synced with the previous one. The drive ID
+    is looked up once per client.
+
+    Raises:
+    - GraphError if the drive ID cannot be read
+    """
+    if client.drive_id is None:
+        response = await client.get(f"{client.base_url}/me/drive?$select=id")
+        if not response.is_success:
+            raise GraphError(response.status_code, response.text)
+        client.drive_id = response.json()["id"]
+
+    mirror = _mirrors.get(client.drive_id)
+    if mirror is None:
+        # Opening a SQLite store reads the database, so it happens off the event loop
+        store = await asyncio.to_thread(open_drive_store, client.drive_id) if MIRROR_DB_DIR else MemoryStore()
+        # Another caller may have created the mirror meanwhile; open_drive_store returned the same store
+        mirror = _mirrors.setdefault(client.drive_id, DriveMirror(client.drive_id, store))
+    return mirror
+
+
+def mark_stale(client: OneDriveClient) -> None:
+    """
+    Force the next read of the client's drive mirror to sync first (after a write through this server).
+
+    If the client has not looked up its drive yet, every mirror is marked.
+    """
+    if client.drive_id is None:
+        for mirror in _mirrors.values():
+            mirror.mark_stale()
+        return
+    mirror = _mirrors.get(client.drive_id)
+    if mirror is not None:
+        mirror.mark_stale()
+
+
+def close_mirrors() -> None:
+    """
+    Drop every mirror and close their stores.
+    """
+    for mirror in _mirrors.values():
+        if isinstance(mirror.store, MemoryStore):
+            mirror.store.close()
+    _mirrors.clear()
+    close_drive_stores()
+
+
+async def mirrored_children(
+        client: OneDriveClient,
+        folder_id: Optional[str]
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    List a folder from the mirror when mirroring is enabled.
+
+    Returns None when mirroring is off or the folder is not in the mirror
+    (for example a folder shared from another drive), so callers can fall
+    back to Graph.
+    """
+    if not MIRROR_ENABLED:
+        return None
+    mirror = await get_mirror(client)
+    await mirror.ensure_synced(client)
+    return await mirror.children(folder_id)
+
+
+async def mirrored_search(
+        client: OneDriveClient,
+        query: str,
+        folders_only: bool = False,
+        limit: Optional[int] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Search item names in the mirror when mirroring is enabled, otherwise return None.
+    """
+    if not MIRROR_ENABLED:
+        return None
+    mirror = await get_mirror(client)
+    await mirror.ensure_synced(client)
+    return await mirror.search(query, folders_only=folders_only, limit=limit)
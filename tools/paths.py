@@ -0,0 +1,93 @@
+import logging
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from .base import OneDriveClient, GraphError
+from . import cache, mirror
+from .fields import COMPACT_SELECT, with_select
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def normalize_path(path: str) -> str:
+    """
+    Normalize a drive path to "/a/b/c" form ("/" for the root).
+    """
+    return "/" + "/".join(part for part in path.strip().split("/") if part)
+
+
+def path_url(client: OneDriveClient, path: str) -> str:
+    """
+    Graph URL addressing an item by its path from the drive root.
+    """
+    path = normalize_path(path)
+    if path == "/":
+        return f"{client.base_url}/me/drive/root"
+    return f"{client.base_url}/me/drive/root:{quote(path, safe='/')}:"
+
+
+async def resolve_item_id(client: OneDriveClient, path: str, select: Optional[str] = COMPACT_SELECT) -> str:
+    """
+    Resolve a drive path to an item ID.
+
+    Paths are matched case-insensitively, like OneDrive does. A resolved
+    path is cached per token until the cache TTL expires or an item is
+    changed through this server; with the drive mirror enabled the path is
+    resolved locally first. Otherwise Graph is asked once via root:/path:
+    addressing, and the returned item is cached by ID as well, with the
+    fields in `select` (compact by default).
+
+    Raises:
+    - GraphError if the path does not exist or Graph answers with an error status
+    """
+    path = normalize_path(path)
+    if path == "/":
+        return "root"
+
+    key = path.lower()
+    if cache.CACHE_ENABLED:
+        entry = cache.metadata_cache.get(client.token_key, cache.PATH, key)
+        if entry is not None and cache.metadata_cache.is_fresh(entry):
+            cache.metadata_cache.stats["hits"] += 1
+            return entry.value
+
+    item = None
+    if mirror.MIRROR_ENABLED:
+        drive_mirror = await mirror.get_mirror(client)
+        await drive_mirror.ensure_synced(client)
+        item = await drive_mirror.resolve_path(path)
+
+    if item is None:
+        response = await client.get(with_select(path_url(client, path), select))
+        if not response.is_success:
+            raise GraphError(response.status_code, response.text)
+        item = response.json()
+        if cache.CACHE_ENABLED:
+            cache.metadata_cache.stats["misses"] += 1
+            cache.metadata_cache.put(client.token_key, cache.ITEM, (item["id"], select), item, item.get("eTag"))
+
+    if cache.CACHE_ENABLED:
+        cache.metadata_cache.put(client.token_key, cache.PATH, key, item["id"], None)
+    return item["id"]
+
+
+async def get_item_by_path(client: OneDriveClient, path: str, select: Optional[str] = COMPACT_SELECT) -> Dict[str, Any]:
+    """
+    Get a driveItem by its path, reusing cached metadata where possible.
+
+    Parameters:
+    - client: OneDrive client to send the requests with
+    - path: Path of the item from the drive root
+    - select: $select value (see fields.select_fields); None fetches every field
+
+    Raises:
+    - GraphError if the path does not exist or Graph answers with an error status
+    """
+    item_id = await resolve_item_id(client, path, select)
+    if item_id == "root":
+        response = await client.get(with_select(path_url(client, "/"), select))
+        if not response.is_success:
+            raise GraphError(response.status_code, response.text)
+        return response.json()
+    return await cache.get_item_cached(client, item_id, select)
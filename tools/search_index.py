@@ -0,0 +1,197 @@
+import bisect
+import heapq
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(name: str) -> List[str]:
+    """
+    Split a lowercase name into alphanumeric words ("Q3 report-final.docx" -> q3, report, final, docx).
+    """
+    return _TOKEN_RE.findall(name)
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    """
+    Inverted index over item names for local search.
+
+    Three indexes answer a query without scanning every item:
+    - words, looked up by prefix through a sorted word list
+    - trigrams of the full name, for substring matches anywhere in a name
+    - folder / file facets, so kind filtering happens inside the index
+
+    Results are ranked in tiers: exact name (with or without extension),
+    whole words, word prefixes, then any substring; within a tier shorter
+    names come first. Lower tiers are only computed while the limit is
+    not yet filled.
+    """
+
+    def __init__(self):
+        self._names: Dict[str, str] = {}
+        # Within a tier: shorter names first, then alphabetical
+        self._order: Dict[str, Tuple[int, str]] = {}
+        self._exact: Dict[str, Set[str]] = {}
+        self._words: Dict[str, Set[str]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._folders: Set[str] = set()
+        self._sorted_words: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, item: Dict[str, Any]) -> None:
+        item_id = item["id"]
+        if item_id in self._names:
+            self.remove(item_id)
+        if "root" in item:
+            return
+
+        name = item.get("name", "").lower()
+        self._names[item_id] = name
+        self._order[item_id] = (len(name), name)
+        for key in _exact_keys(name):
+            self._exact.setdefault(key, set()).add(item_id)
+        for word in set(tokenize(name)):
+            if word not in self._words:
+                self._words[word] = set()
+                self._sorted_words = None
+            self._words[word].add(item_id)
+        for gram in trigrams(name):
+            self._trigrams.setdefault(gram, set()).add(item_id)
+        if "folder" in item:
+            self._folders.add(item_id)
+
+    def remove(self, item_id: str) -> None:
+        name = self._names.pop(item_id, None)
+        if name is None:
+            return
+        del self._order[item_id]
+        for key in _exact_keys(name):
+            ids = self._exact.get(key)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self._exact[key]
+        for word in set(tokenize(name)):
+            ids = self._words.get(word)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self._words[word]
+                    self._sorted_words = None
+        for gram in trigrams(name):
+            ids = self._trigrams.get(gram)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self._trigrams[gram]
+        self._folders.discard(item_id)
+
+    def rebuild(self, items: Iterable[Dict[str, Any]]) -> None:
+        self.clear()
+        for item in items:
+            self.add(item)
+
+    def clear(self) -> None:
+        self._names.clear()
+        self._order.clear()
+        self._exact.clear()
+        self._words.clear()
+        self._trigrams.clear()
+        self._folders.clear()
+        self._sorted_words = None
+
+    def _word_prefix_ids(self, prefix: str) -> Set[str]:
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self._words)
+        ids: Set[str] = set()
+        start = bisect.bisect_left(self._sorted_words, prefix)
+        for word in self._sorted_words[start:]:
+            if not word.startswith(prefix):
+                break
+            ids |= self._words[word]
+        return ids
+
+    def _substring_ids(self, text: str) -> Set[str]:
+        grams = sorted((self._trigrams.get(gram, set()) for gram in trigrams(text)), key=len)
+        if not grams or not grams[0]:
+            return set()
+        ids = set(grams[0])
+        for other in grams[1:]:
+            ids &= other
+            if not ids:
+                break
+        return {item_id for item_id in ids if text in self._names[item_id]}
+
+    def _all_words(self, words: List[str], lookup) -> Set[str]:
+        ids = lookup(words[0])
+        for word in words[1:]:
+            if not ids:
+                break
+            ids = ids & lookup(word)
+        return ids
+
+    def search(
+            self,
+            query: str,
+            folders_only: bool = False,
+            files_only: bool = False,
+            limit: Optional[int] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        Find items whose name contains the query, or whose words start with every query word.
+
+        Parameters:
+        - query: Text to look for (case-insensitive)
+        - folders_only: Return only folders
+        - files_only: Return only files
+        - limit: Most results to return (optional)
+
+        Returns:
+        - List of (item_id, score) pairs, best match first
+        """
+        query = query.strip().lower()
+        words = tokenize(query)
+        if not words:
+            return []
+
+        # "annual rep" also finds "Report - Annual 2024"
+        tiers = [
+            (100, lambda: set(self._exact.get(query, ()))),
+            (30, lambda: self._all_words(words, lambda word: set(self._words.get(word, ())))),
+            (20, lambda: self._all_words(words, self._word_prefix_ids)),
+            (10, lambda: self._substring_ids(query) if len(query) >= 3 else set()),
+        ]
+
+        results: List[Tuple[str, int]] = []
+        seen: Set[str] = set()
+        for score, candidates in tiers:
+            ids = candidates() - seen
+            if folders_only:
+                ids &= self._folders
+            elif files_only:
+                ids -= self._folders
+            if not ids:
+                continue
+
+            wanted = None if limit is None else limit - len(results)
+            sort_key = self._order.__getitem__
+            ordered = sorted(ids, key=sort_key) if wanted is None else heapq.nsmallest(wanted, ids, key=sort_key)
+            results.extend((item_id, score) for item_id in ordered)
+            seen |= ids
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+def _exact_keys(name: str) -> Set[str]:
+    """
+    Keys under which a name counts as an exact match: the full name and the name without its extension.
+    """
+    return {name, name.rsplit(".", 1)[0]} if "." in name else {name}
@@ -1,15 +1,228 @@
-import requests
+import asyncio
+import contextlib
 import logging
-from typing import Tuple, Union, Dict, List, Any
-from .base import get_onedrive_client
+import os
+from typing import Tuple, Union, Dict, List, Any, Optional, AsyncIterator
+from .base import get_onedrive_client, OneDriveClient, GraphError
+from . import cache, mirror
+from .paths import resolve_item_id, get_item_by_path
+from .fields import COMPACT_SELECT, select_fields, with_select, project_item
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-async def onedrive_list_root_files_folders() -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+# Pages fetched ahead of the consumer while walking a collection
+PAGE_PREFETCH = int(os.getenv("ONEDRIVE_PAGE_PREFETCH", "1"))
+
+_END_OF_PAGES = object()
+
+async def _fetch_page(client: OneDriveClient, url: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page of a Graph collection and return its items and next link.
+    """
+    response = await client.get(url)
+    if not response.is_success:
+        raise GraphError(response.status_code, response.text)
+    data = response.json()
+    return data.get('value', []), data.get('@odata.nextLink')
+
+async def _prefetched_pages(
+    client: OneDriveClient,
+    url: str,
+    depth: int,
+    max_items: Optional[int]
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield pages while a background task fetches the following ones.
+
+    The queue holds at most `depth` pages, so the producer waits when the
+    consumer falls behind and memory stays bounded.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=depth)
+
+    async def produce() -> None:
+        next_url = url
+        fetched = 0
+        try:
+            while next_url:
+                items, next_url = await _fetch_page(client, next_url)
+                fetched += len(items)
+                if max_items is not None and fetched >= max_items:
+                    next_url = None
+                await queue.put(items)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_END_OF_PAGES)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            page = await queue.get()
+            if page is _END_OF_PAGES:
+                return
+            if isinstance(page, Exception):
+                raise page
+            yield page
+    finally:
+        producer.cancel()
+        # Wait for the cancelled fetch, so no request outlives the generator
+        await asyncio.gather(producer, return_exceptions=True)
+
+async def iter_graph_pages(
+    client: OneDriveClient,
+    url: str,
+    top: Optional[int] = None,
+    max_items: Optional[int] = None,
+    prefetch: Optional[int] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield pages of items from a Graph collection, following @odata.nextLink.
+
+    Only a bounded number of pages is held at a time, so callers can stream
+    through large folders or stop early without fetching the remaining pages.
+
+    Parameters:
+    - client: OneDrive client to send the requests with
+    - url: URL of the first page
+    - top: Page size requested from Graph ($top)
+    - max_items: Stop after yielding this many items in total
+    - prefetch: Pages fetched ahead while the caller processes the current one
+                (default ONEDRIVE_PAGE_PREFETCH; 0 fetches strictly one at a time)
+
+    Raises:
+    - GraphError if any page request fails
+    """
+    if top:
+        url = f"{url}{'&' if '?' in url else '?'}$top={top}"
+    depth = PAGE_PREFETCH if prefetch is None else prefetch
+
+    if depth > 0:
+        pages = _prefetched_pages(client, url, depth, max_items)
+    else:
+        pages = _sequential_pages(client, url)
+
+    remaining = max_items
+    async with contextlib.aclosing(pages):
+        async for items in pages:
+            if remaining is not None:
+                items = items[:remaining]
+                remaining -= len(items)
+            yield items
+
+            if remaining is not None and remaining <= 0:
+                return
+
+async def _sequential_pages(client: OneDriveClient, url: Optional[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+    while url:
+        items, url = await _fetch_page(client, url)
+        yield items
+
+async def collect_graph_items(
+    client: OneDriveClient,
+    url: str,
+    top: Optional[int] = None,
+    max_items: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Return every item of a Graph collection across all pages.
+    """
+    items = []
+    async for page in iter_graph_pages(client, url, top=top, max_items=max_items):
+        items.extend(page)
+    return items
+
+async def list_children_cached(
+        client: OneDriveClient,
+        folder_id: Optional[str],
+        top: Optional[int] = None,
+        max_items: Optional[int] = None,
+        select: Optional[str] = COMPACT_SELECT,
+        tag: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    List a folder's children (the drive root when folder_id is None), served from the cache while fresh.
+
+    A stale listing is revalidated by comparing the folder's eTag, so an
+    unchanged folder costs one small metadata call instead of paging
+    through every child. The eTag does not reliably change with every
+    child change, so a listing older than ONEDRIVE_CACHE_LISTING_MAX_AGE
+    is refetched in full.
+
+    When the drive mirror is enabled and holds the folder, the listing is
+    answered from the mirror instead.
+
+    `select` is sent as $select (None lists every field); listings with
+    different projections are cached separately. A caller that already
+    holds the folder's current eTag (from a parent listing it just read
+    from Graph, see list_children_live) passes it as `tag` to save the
+    metadata call.
+
+    Raises:
+    - GraphError if Graph answers with an error status
+    """
+    items, _ = await list_children_live(client, folder_id, top, max_items, select, tag)
+    return items
+
+
+async def list_children_live(
+        client: OneDriveClient,
+        folder_id: Optional[str],
+        top: Optional[int] = None,
+        max_items: Optional[int] = None,
+        select: Optional[str] = COMPACT_SELECT,
+        tag: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    List a folder's children like list_children_cached, and tell whether the listing is live.
+
+    Returns:
+    - Tuple of the children and whether they were just read from Graph (or the synced
+      mirror) rather than served or revalidated from the cache. Only a live listing's
+      eTags may be passed on as `tag` for its subfolders.
+    """
+    mirrored = await mirror.mirrored_children(client, folder_id)
+    if mirrored is not None:
+        mirrored = mirrored[:max_items] if max_items is not None else mirrored
+        return [project_item(item, select) for item in mirrored], True
+
+    folder_url = f"{client.base_url}/me/drive/items/{folder_id}" if folder_id else f"{client.base_url}/me/drive/root"
+    children_url = with_select(f"{folder_url}/children", select)
+    if not cache.CACHE_ENABLED:
+        return await collect_graph_items(client, children_url, top=top, max_items=max_items), True
+
+    key = (folder_id or "root", select, max_items)
+    entry = cache.metadata_cache.get(client.token_key, cache.CHILDREN, key)
+    if entry is not None and cache.metadata_cache.is_fresh(entry):
+        cache.metadata_cache.stats["hits"] += 1
+        return entry.value, False
+
+    # The tag is read before the listing, so a concurrent change can only make the cached listing look stale
+    if tag is None:
+        tag = await cache.get_folder_tag(client, folder_url)
+    if entry is not None and tag and tag == entry.tag and cache.metadata_cache.within_max_age(entry):
+        cache.metadata_cache.stats["revalidated"] += 1
+        cache.metadata_cache.touch(entry)
+        return entry.value, False
+
+    items = await collect_graph_items(client, children_url, top=top, max_items=max_items)
+    cache.metadata_cache.stats["misses"] += 1
+    cache.metadata_cache.put(client.token_key, cache.CHILDREN, key, items, tag)
+    return items, True
+
+async def onedrive_list_root_files_folders(
+    top: Optional[int] = None,
+    max_items: Optional[int] = None,
+    fields: Optional[str] = None
+) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
     """
     List all files and folders in the root of OneDrive.
 
+    Parameters:
+    - top: Page size requested from Graph (optional)
+    - max_items: Maximum number of items to return (optional, default all)
+    - fields: "compact" (default), "full", or comma-separated driveItem fields to return (optional)
+
     Returns:
     - On success: Tuple with status message and dictionary containing items
     - On failure: Tuple with error message and details
@@ -19,29 +232,32 @@ async def onedrive_list_root_files_folders() -> Union[Tuple[str, Dict[str, Any]]
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/root/children"
-
     try:
         logger.info("Listing files and folders in root directory")
-        response = requests.get(url, headers=client['headers'])
-
-        if response.ok:
-            files = response.json()
-            logger.info(f"Found {len(files.get('value', []))} items in root")
-            return ("Files:", files)
-        else:
-            logger.error(f"Error listing root items: {response.status_code} - {response.text}")
-            return ("Error:", response.status_code, response.text)
+        items = await list_children_cached(client, None, top=top, max_items=max_items, select=select_fields(fields))
+        logger.info(f"Found {len(items)} items in root")
+        return ("Files:", {"value": items})
+    except GraphError as e:
+        logger.error(f"Error listing root items: {e}")
+        return ("Error:", e.status_code, e.text)
     except Exception as e:
         logger.error(f"Exception while listing root items: {e}")
         return ("Error:", str(e))
 
-async def onedrive_list_inside_folder(folder_id: str) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+async def onedrive_list_inside_folder(
+    folder_id: str,
+    top: Optional[int] = None,
+    max_items: Optional[int] = None,
+    fields: Optional[str] = None
+) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
     """
     List all items inside a specific folder.
 
     Parameters:
     - folder_id: The ID of the folder to list contents from
+    - top: Page size requested from Graph (optional)
+    - max_items: Maximum number of items to return (optional, default all)
+    - fields: "compact" (default), "full", or comma-separated driveItem fields to return (optional)
 
     Returns:
     - On success: Tuple with status message and dictionary containing items
@@ -52,29 +268,32 @@ async def onedrive_list_inside_folder(folder_id: str) -> Union[Tuple[str, Dict[s
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/items/{folder_id}/children"
-
     try:
         logger.info(f"Listing items inside folder ID: {folder_id}")
-        response = requests.get(url, headers=client['headers'])
-
-        if response.ok:
-            items = response.json()
-            logger.info(f"Found {len(items.get('value', []))} items in folder {folder_id}")
-            return ("Items inside folder:", items)
-        else:
-            logger.error(f"Error listing folder items: {response.status_code} - {response.text}")
-            return ("Error:", response.status_code, response.text)
+        items = await list_children_cached(client, folder_id, top=top, max_items=max_items, select=select_fields(fields))
+        logger.info(f"Found {len(items)} items in folder {folder_id}")
+        return ("Items inside folder:", {"value": items})
+    except GraphError as e:
+        logger.error(f"Error listing folder items: {e}")
+        return ("Error:", e.status_code, e.text)
     except Exception as e:
         logger.error(f"Exception while listing folder items: {e}")
         return ("Error:", str(e))
 
-async def onedrive_search_item_by_name(itemname: str) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+async def onedrive_search_item_by_name(
+    itemname: str,
+    top: Optional[int] = None,
+    max_items: Optional[int] = None,
+    fields: Optional[str] = None
+) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
     """
     Search for items by name in OneDrive.
 
     Parameters:
     - itemname: The name or partial name of the item to search for
+    - top: Page size requested from Graph (optional)
+    - max_items: Maximum number of results to return (optional, default all)
+    - fields: "compact" (default), "full", or comma-separated driveItem fields to return (optional)
 
     Returns:
     - On success: Tuple with status message and dictionary containing search results
@@ -85,29 +304,39 @@ async def onedrive_search_item_by_name(itemname: str) -> Union[Tuple[str, Dict[s
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/root/search(q='{itemname}')"
+    url = f"{client.base_url}/me/drive/root/search(q='{itemname}')"
 
     try:
         logger.info(f"Searching for items with name: {itemname}")
-        response = requests.get(url, headers=client['headers'])
-
-        if response.ok:
-            items = response.json()
-            logger.info(f"Found {len(items.get('value', []))} matching items")
-            return ("Found items:", items)
+        select = select_fields(fields)
+        items = await mirror.mirrored_search(client, itemname, limit=max_items)
+        if items is not None:
+            items = [project_item(item, select) for item in items]
         else:
-            logger.error(f"Error searching items: {response.status_code} - {response.text}")
-            return ("Error:", response.status_code, response.text)
+            items = await collect_graph_items(client, with_select(url, select), top=top, max_items=max_items)
+        logger.info(f"Found {len(items)} matching items")
+        return ("Found items:", {"value": items})
+    except GraphError as e:
+        logger.error(f"Error searching items: {e}")
+        return ("Error:", e.status_code, e.text)
     except Exception as e:
         logger.error(f"Exception while searching items: {e}")
         return ("Error:", str(e))
 
-async def onedrive_search_folder_by_name(folder_name: str) -> Union[Tuple[str, List[Dict[str, Any]]], Tuple[str, int, str]]:
+async def onedrive_search_folder_by_name(
+    folder_name: str,
+    top: Optional[int] = None,
+    max_items: Optional[int] = None,
+    fields: Optional[str] = None
+) -> Union[Tuple[str, List[Dict[str, Any]]], Tuple[str, int, str]]:
     """
     Search for folders by name in OneDrive.
 
     Parameters:
     - folder_name: The name or partial name of the folder to search for
+    - top: Page size requested from Graph (optional)
+    - max_items: Maximum number of folders to return (optional, default all)
+    - fields: "compact" (default), "full", or comma-separated driveItem fields to return (optional)
 
     Returns:
     - On success: Tuple with status message and list of matching folders
@@ -118,30 +347,42 @@ async def onedrive_search_folder_by_name(folder_name: str) -> Union[Tuple[str, L
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/root/search(q='{folder_name}')"
+    url = f"{client.base_url}/me/drive/root/search(q='{folder_name}')"
 
     try:
         logger.info(f"Searching for folders with name: {folder_name}")
-        response = requests.get(url, headers=client['headers'])
-
-        if response.ok:
-            data = response.json()
-            folders = [item for item in data.get('value', []) if 'folder' in item]
+        select = select_fields(fields)
+        folders = await mirror.mirrored_search(client, folder_name, folders_only=True, limit=max_items)
+        if folders is not None:
             logger.info(f"Found {len(folders)} matching folders")
-            return ("Found folders:", folders)
-        else:
-            logger.error(f"Error searching folders: {response.status_code} - {response.text}")
-            return ("Error:", response.status_code, response.text)
+            return ("Found folders:", [project_item(folder, select) for folder in folders])
+
+        # The folder facet is needed to tell folders from files
+        if select is not None and "folder" not in select.split(","):
+            select = f"{select},folder"
+        folders = []
+        async with contextlib.aclosing(iter_graph_pages(client, with_select(url, select), top=top)) as pages:
+            async for page in pages:
+                folders.extend(item for item in page if 'folder' in item)
+                if max_items is not None and len(folders) >= max_items:
+                    folders = folders[:max_items]
+                    break
+        logger.info(f"Found {len(folders)} matching folders")
+        return ("Found folders:", folders)
+    except GraphError as e:
+        logger.error(f"Error searching folders: {e}")
+        return ("Error:", e.status_code, e.text)
     except Exception as e:
         logger.error(f"Exception while searching folders: {e}")
         return ("Error:", str(e))
 
-async def onedrive_get_item_by_id(item_id: str) -> Union[Dict[str, Any], Tuple[str, int, str]]:
+async def onedrive_get_item_by_id(item_id: str, fields: Optional[str] = None) -> Union[Dict[str, Any], Tuple[str, int, str]]:
     """
     Get item details by its ID.
 
     Parameters:
     - item_id: The ID of the item to retrieve
+    - fields: "compact" (default), "full", or comma-separated driveItem fields to return (optional)
 
     Returns:
     - On success: Dictionary containing item details
@@ -152,19 +393,86 @@ async def onedrive_get_item_by_id(item_id: str) -> Union[Dict[str, Any], Tuple[s
         logger.error("Could not get OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/items/{item_id}"
-
     try:
         logger.info(f"Getting item with ID: {item_id}")
-        response = requests.get(url, headers=client['headers'])
-
-        if response.ok:
-            data = response.json()
-            logger.info(f"Successfully retrieved item: {data.get('name', 'unknown')}")
-            return data
-        else:
-            logger.error(f"Error getting item: {response.status_code} - {response.text}")
-            return ("Error:", response.status_code, response.text)
+        data = await cache.get_item_cached(client, item_id, select_fields(fields))
+        logger.info(f"Successfully retrieved item: {data.get('name', 'unknown')}")
+        return data
+    except GraphError as e:
+        logger.error(f"Error getting item: {e}")
+        return ("Error:", e.status_code, e.text)
     except Exception as e:
         logger.error(f"Exception while getting item: {e}")
-        return ("Error:", str(e))
\ No newline at end of file
+        return ("Error:", str(e))
+
+async def onedrive_get_item_by_path(path: str, fields: Optional[str] = None) -> Union[Dict[str, Any], Tuple[str, int, str]]:
+    """
+    Get item details by its path from the drive root.
+
+    Parameters:
+    - path: Path of the item, e.g. "/Reports/2026/q3.csv"
+    - fields: "compact" (default), "full", or comma-separated driveItem fields to return (optional)
+
+    Returns:
+    - On success: Dictionary containing item details
+    - On failure: Tuple with error message and details
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    try:
+        logger.info(f"Getting item at path: {path}")
+        data = await get_item_by_path(client, path, select_fields(fields))
+        logger.info(f"Successfully retrieved item: {data.get('name', 'unknown')}")
+        return data
+    except GraphError as e:
+        logger.error(f"Error getting item at path {path}: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception while getting item by path: {e}")
+        return ("Error:", str(e))
+
+async def onedrive_list_folder_by_path(
+    path: str,
+    top: Optional[int] = None,
+    max_items: Optional[int] = None,
+    fields: Optional[str] = None
+) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+    """
+    List all items inside a folder given by its path from the drive root.
+
+    Parameters:
+    - path: Path of the folder, e.g. "/Reports/2026" ("/" for the root)
+    - top: Page size requested from Graph (optional)
+    - max_items: Maximum number of items to return (optional, default all)
+    - fields: "compact" (default), "full", or comma-separated driveItem fields to return (optional)
+
+    Returns:
+    - On success: Tuple with status message and dictionary containing items
+    - On failure: Tuple with error message and details
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    try:
+        logger.info(f"Listing items inside folder path: {path}")
+        folder_id = await resolve_item_id(client, path)
+        items = await list_children_cached(
+            client,
+            None if folder_id == "root" else folder_id,
+            top=top,
+            max_items=max_items,
+            select=select_fields(fields)
+        )
+        logger.info(f"Found {len(items)} items in folder {path}")
+        return ("Items inside folder:", {"value": items})
+    except GraphError as e:
+        logger.error(f"Error listing folder path {path}: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception while listing folder by path: {e}")
+        return ("Error:", str(e))
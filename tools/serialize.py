@@ -0,0 +1,99 @@
+import json
+import os
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used instead
+    orjson = None
+
+# "compact" (default) sends JSON without whitespace; "pretty" indents it for reading
+RESPONSE_FORMAT = os.getenv("ONEDRIVE_RESPONSE_FORMAT", "compact").lower()
+# Trim driveItems in tool results to the fields listed in COMPACT_ITEM_FIELDS
+COMPACT_ITEMS = os.getenv("ONEDRIVE_COMPACT_ITEMS", "true").lower() in ("1", "true", "yes")
+
+# driveItem field -> None to keep the value as-is, or the sub-fields to keep of a facet
+COMPACT_ITEM_FIELDS: Dict[str, Optional[tuple]] = {
+    "id": None,
+    "name": None,
+    "size": None,
+    "lastModifiedDateTime": None,
+    "webUrl": None,
+    "root": (),
+    "deleted": (),
+    "folder": ("childCount",),
+    "file": ("mimeType",),
+    "package": ("type",),
+    "parentReference": ("driveId", "id", "path"),
+    "remoteItem": None,  # compacted like the item itself
+    "uploadMetrics": None,  # added by the upload tools, not a Graph field
+}
+
+# Any of these next to "id" and "name" marks a dict as a driveItem
+_ITEM_MARKERS = ("file", "folder", "root", "package", "parentReference", "remoteItem", "eTag", "cTag")
+
+
+def is_drive_item(value: Dict[str, Any]) -> bool:
+    return "id" in value and "name" in value and any(marker in value for marker in _ITEM_MARKERS)
+
+
+def compact_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keep only the driveItem fields in COMPACT_ITEM_FIELDS.
+
+    Parameters:
+    - item: driveItem as returned by Graph
+
+    Returns:
+    - New dictionary with the same shape as the driveItem, minus unlisted fields
+    """
+    compact = {}
+    for field, keep in COMPACT_ITEM_FIELDS.items():
+        if field not in item:
+            continue
+        value = item[field]
+        if field == "remoteItem" and isinstance(value, dict):
+            value = compact_item(value)
+        elif keep is not None and isinstance(value, dict):
+            value = {key: value[key] for key in keep if key in value}
+        compact[field] = value
+    return compact
+
+
+def compact_result(result: Any) -> Any:
+    """
+    Compact every driveItem found in a tool result (tuples, lists and dicts are walked).
+
+    "@odata.context" annotations are dropped along the way.
+    """
+    if isinstance(result, dict):
+        if is_drive_item(result):
+            return compact_item(result)
+        return {key: compact_result(value) for key, value in result.items() if key != "@odata.context"}
+    if isinstance(result, (list, tuple)):
+        return [compact_result(value) for value in result]
+    return result
+
+
+def serialize_result(result: Any, compact: bool = COMPACT_ITEMS, pretty: bool = RESPONSE_FORMAT == "pretty") -> str:
+    """
+    Serialize a tool result to JSON text.
+
+    Uses orjson when it is installed and the json module otherwise.
+
+    Parameters:
+    - result: Value returned by an onedrive_* tool
+    - compact: Trim driveItems to COMPACT_ITEM_FIELDS (default ONEDRIVE_COMPACT_ITEMS)
+    - pretty: Indent the output (default: ONEDRIVE_RESPONSE_FORMAT=pretty)
+
+    Returns:
+    - JSON text
+    """
+    if compact:
+        result = compact_result(result)
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(result, option=option).decode()
+    if pretty:
+        return json.dumps(result, indent=2, ensure_ascii=False)
+    return json.dumps(result, separators=(",", ":"), ensure_ascii=False)
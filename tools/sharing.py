@@ -1,15 +1,22 @@
-import requests
 import logging
-from typing import Tuple, Union, Dict, Any, Literal
-from .base import get_onedrive_client
+from typing import Tuple, Union, Dict, Any, Literal, Optional
+from .base import get_onedrive_client, GraphError
+from .search_n_list import collect_graph_items
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-async def onedrive_list_shared_items() -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+async def onedrive_list_shared_items(
+    top: Optional[int] = None,
+    max_items: Optional[int] = None
+) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
     """
     List all items shared with the current user in OneDrive.
 
+    Parameters:
+    - top: Page size requested from Graph (optional)
+    - max_items: Maximum number of items to return (optional, default all)
+
     Returns:
     - On success: Tuple with status message and dictionary containing shared items
     - On failure: Tuple with error message and details (status code and response text)
@@ -24,20 +31,16 @@ async def onedrive_list_shared_items() -> Union[Tuple[str, Dict[str, Any]], Tupl
         logger.error("Failed to initialize OneDrive client")
         return ("Could not get OneDrive client",)
 
-    url = f"{client['base_url']}/me/drive/sharedWithMe"
+    url = f"{client.base_url}/me/drive/sharedWithMe"
 
     try:
         logger.info("Requesting list of shared items")
-        response = requests.get(url, headers=client['headers'])
-
-        if response.ok:
-            items = response.json()
-            item_count = len(items.get('value', []))
-            logger.info(f"Successfully retrieved {item_count} shared items")
-            return ("Items shared with me:", items)
-        else:
-            logger.error(f"Failed to get shared items. Status: {response.status_code}, Response: {response.text}")
-            return ("Error:", response.status_code, response.text)
+        items = await collect_graph_items(client, url, top=top, max_items=max_items)
+        logger.info(f"Successfully retrieved {len(items)} shared items")
+        return ("Items shared with me:", {"value": items})
+    except GraphError as e:
+        logger.error(f"Failed to get shared items. Status: {e.status_code}, Response: {e.text}")
+        return ("Error:", e.status_code, e.text)
     except Exception as e:
         logger.error(f"Exception while fetching shared items: {str(e)}")
         return ("Error:", str(e))
@@ -78,7 +81,7 @@ async def onedrive_create_share_link(
         logger.error(f"Invalid link type specified: {link_type}")
         return ("Error:", 400, "Invalid link type. Must be 'view', 'edit', or 'embed'")
 
-    url = f"{client['base_url']}/me/drive/items/{item_id}/createLink"
+    url = f"{client.base_url}/me/drive/items/{item_id}/createLink"
     data = {
         "type": link_type,
         "scope": scope
@@ -86,13 +89,13 @@ async def onedrive_create_share_link(
 
     try:
         logger.info(f"Creating {link_type} share link for item {item_id} (scope: {scope})")
-        response = requests.post(
+        response = await client.post(
             url,
-            headers={**client['headers'], "Content-Type": "application/json"},
+            headers={"Content-Type": "application/json"},
             json=data
         )
 
-        if response.ok:
+        if response.is_success:
             result = response.json()
             logger.info(f"Successfully created share link for item {item_id}")
             logger.debug(f"Share link details: {result}")
@@ -0,0 +1,164 @@
+import contextlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from .search_index import NameIndex
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Directory for persistent drive mirrors; empty keeps mirrors in memory only
+MIRROR_DB_DIR = os.getenv("ONEDRIVE_MIRROR_DB_DIR", "")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    parent_id TEXT,
+    name_lower TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_parent ON items(parent_id);
+CREATE INDEX IF NOT EXISTS items_name ON items(name_lower);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SqliteStore:
+    """
+    Drive mirror store persisted to a SQLite file (WAL mode).
+
+    Holds the same data as mirror.MemoryStore, including the delta token,
+    so a restarted server resumes syncing where it stopped. Writes made
+    inside transaction() are committed together; other writes commit
+    immediately.
+
+    Queries block, so DriveMirror only uses the store through `executor`;
+    its single thread keeps them off the event loop and one at a time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="drive-store")
+        # Opened here, then only used on the executor thread
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._in_transaction = False
+        # Name index shared by every mirror using this store, kept current by DriveMirror.sync
+        self.index: Optional[NameIndex] = None
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        if self._in_transaction:
+            yield
+            return
+        self._conn.execute("BEGIN")
+        self._in_transaction = True
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        else:
+            self._conn.execute("COMMIT")
+        finally:
+            self._in_transaction = False
+
+    def get(self, item_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT data FROM items WHERE id = ?", (item_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, item: Dict[str, Any]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO items (id, parent_id, name_lower, data) VALUES (?, ?, ?, ?)",
+            (
+                item["id"],
+                (item.get("parentReference") or {}).get("id"),
+                item.get("name", "").lower(),
+                json.dumps(item, separators=(",", ":"))
+            )
+        )
+
+    def delete(self, item_id: str) -> None:
+        self._conn.execute("DELETE FROM items WHERE id = ?", (item_id,))
+
+    def children(self, parent_id: str) -> List[Dict[str, Any]]:
+        rows = self._conn.execute("SELECT data FROM items WHERE parent_id = ?", (parent_id,))
+        return [json.loads(row[0]) for row in rows]
+
+    def find_child(self, parent_id: str, name: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT data FROM items WHERE parent_id = ? AND name_lower = ?", (parent_id, name.lower())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def items(self) -> Iterator[Dict[str, Any]]:
+        for row in self._conn.execute("SELECT data FROM items").fetchall():
+            yield json.loads(row[0])
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: Optional[str]) -> None:
+        if value is None:
+            self._conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+        else:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def clear(self) -> None:
+        with self.transaction():
+            self._conn.execute("DELETE FROM items")
+            self._conn.execute("DELETE FROM meta")
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        self._conn.close()
+
+
+# drive ID -> open store, shared by every token mirroring that drive
+_stores: Dict[str, SqliteStore] = {}
+# open_drive_store runs in worker threads
+_stores_lock = threading.Lock()
+
+
+def open_drive_store(drive_id: str, directory: Optional[str] = None) -> SqliteStore:
+    """
+    Open (or reuse) the SQLite store for a drive.
+
+    Parameters:
+    - drive_id: Graph drive ID, used to name the database file
+    - directory: Where database files live (default ONEDRIVE_MIRROR_DB_DIR)
+    """
+    with _stores_lock:
+        store = _stores.get(drive_id)
+        if store is None:
+            directory = directory or MIRROR_DB_DIR
+            os.makedirs(directory, exist_ok=True)
+            safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", drive_id)
+            store = SqliteStore(os.path.join(directory, f"drive-{safe_id}.sqlite3"))
+            _stores[drive_id] = store
+            logger.info(f"Opened drive mirror store {store.path} ({len(store)} items)")
+        return store
+
+
+def close_drive_stores() -> None:
+    """
+    Close every open drive store.
+    """
+    for store in _stores.values():
+        store.close()
+    _stores.clear()
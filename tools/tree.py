@@ -0,0 +1,307 @@
+import asyncio
+import collections
+import contextlib
+import heapq
+import logging
+import os
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from .base import get_onedrive_client, OneDriveClient, GraphError
+from .cache import get_item_cached
+from .fields import COMPACT_SELECT, select_fields
+from .paths import resolve_item_id
+from .search_n_list import list_children_live
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Folder listings requested at once while walking a tree
+WALK_CONCURRENCY = int(os.getenv("ONEDRIVE_WALK_CONCURRENCY", "8"))
+
+# Fields folder statistics need per item
+_STATS_SELECT = "id,name,size,cTag,eTag,file,folder"
+
+
+class TreeEntry(NamedTuple):
+    item: Dict[str, Any]
+    path: str  # relative to the walked folder, e.g. "Reports/q3.csv"
+    depth: int  # 1 for the walked folder's direct children
+
+
+class TreeWalker:
+    """
+    Breadth-first walk of a folder's subtree.
+
+    Up to `concurrency` folder listings are in flight at once; entries are
+    yielded as each listing arrives, so callers can stream or stop early
+    (pending listings are cancelled when the iteration is closed).
+    Listings go through list_children_live, so the drive mirror and the
+    metadata cache answer them when they can.
+
+    A subfolder that cannot be listed is recorded in `errors` and skipped;
+    failing to list the walked folder itself raises GraphError. When
+    `follow` is given, the walk only descends into folders whose path it
+    accepts (the folders themselves are still yielded).
+    """
+
+    def __init__(
+            self,
+            client: OneDriveClient,
+            folder_id: Optional[str] = None,
+            max_depth: Optional[int] = None,
+            concurrency: Optional[int] = None,
+            select: Optional[str] = COMPACT_SELECT,
+            follow: Optional[Callable[[str], bool]] = None
+    ):
+        self.client = client
+        self.folder_id = None if folder_id == "root" else folder_id
+        self.max_depth = max_depth
+        self.concurrency = max(1, concurrency or WALK_CONCURRENCY)
+        # The folder facet tells which children to descend into
+        if select is not None and "folder" not in select.split(","):
+            select = f"{select},folder"
+        self.select = select
+        self.follow = follow
+        self.folders_listed = 0
+        self.errors: List[Dict[str, Any]] = []
+        # Walk state, read by has_more while the iteration is paused
+        self._pending: Deque[Tuple[Optional[str], Optional[str], str, int]] = collections.deque()
+        self._running: Dict[asyncio.Task, Tuple[Optional[str], Optional[str], str, int]] = {}
+        self._unyielded = 0
+
+    @property
+    def has_more(self) -> bool:
+        """
+        Whether the walk has entries left after the last one it yielded.
+        """
+        return bool(self._unyielded or self._pending or self._running)
+
+    async def _list(self, folder_id: Optional[str], tag: Optional[str]) -> Tuple[List[Dict[str, Any]], bool]:
+        return await list_children_live(self.client, folder_id, select=self.select, tag=tag)
+
+    async def walk(self) -> AsyncIterator[TreeEntry]:
+        # (folder ID, folder eTag from its parent's listing, path, depth of its children)
+        pending = self._pending = collections.deque([(self.folder_id, None, "", 1)])
+        running = self._running = {}
+        try:
+            while pending or running:
+                while pending and len(running) < self.concurrency:
+                    folder = pending.popleft()
+                    running[asyncio.create_task(self._list(folder[0], folder[1]))] = folder
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    folder_id, _, folder_path, depth = running.pop(task)
+                    try:
+                        children, live = task.result()
+                    except GraphError as e:
+                        if depth == 1:
+                            raise
+                        logger.warning(f"Could not list folder {folder_path or '/'}: {e}")
+                        self.errors.append({"id": folder_id or "root", "path": folder_path, "status": e.status_code})
+                        continue
+                    self.folders_listed += 1
+
+                    for index, item in enumerate(children):
+                        self._unyielded = len(children) - index - 1
+                        path = f"{folder_path}/{item.get('name', '')}" if folder_path else item.get("name", "")
+                        if ("folder" in item and (self.max_depth is None or depth < self.max_depth)
+                                and (self.follow is None or self.follow(path))):
+                            # A cached listing's eTags may be outdated; those subfolders read their own
+                            pending.append((item["id"], item.get("eTag") if live else None, path, depth + 1))
+                        yield TreeEntry(item, path, depth)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+
+async def onedrive_walk_tree(
+        folder_id: Optional[str] = None,
+        path: Optional[str] = None,
+        max_depth: Optional[int] = None,
+        files_only: bool = False,
+        folders_only: bool = False,
+        name_contains: Optional[str] = None,
+        max_items: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        fields: Optional[str] = None
+) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+    """
+    List every item below a folder, breadth-first, with concurrent folder listings.
+
+    Parameters:
+    - folder_id: ID of the folder to walk (optional, default the drive root)
+    - path: Path of the folder to walk, used when folder_id is not given (optional)
+    - max_depth: Deepest level to list, 1 = direct children only (optional, default unlimited)
+    - files_only: Return only files (filters results; folders are still walked)
+    - folders_only: Return only folders
+    - name_contains: Return only items whose name contains this text, case-insensitive (optional)
+    - max_items: Stop as soon as this many items match (optional, default all)
+    - max_concurrency: Folder listings in flight at once (optional, default ONEDRIVE_WALK_CONCURRENCY)
+    - fields: "compact" (default), "full", or comma-separated driveItem fields to return (optional)
+
+    Returns:
+    - On success: Tuple with status message and dictionary with the matching entries
+      (path relative to the folder, depth and item), folders listed, unlistable folders
+      and whether the walk stopped at max_items with items left unvisited
+    - On failure: Tuple with error message and details
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    if max_items is not None and max_items < 1:
+        logger.error(f"Invalid max_items option: {max_items}")
+        return ("Invalid max_items option.",)
+
+    try:
+        if folder_id is None and path is not None:
+            folder_id = await resolve_item_id(client, path)
+        logger.info(f"Walking folder tree under {folder_id or 'root'} (max_depth={max_depth})")
+
+        walker = TreeWalker(client, folder_id, max_depth=max_depth, concurrency=max_concurrency,
+                            select=select_fields(fields))
+        needle = name_contains.lower() if name_contains else None
+        entries = []
+        truncated = False
+        async with contextlib.aclosing(walker.walk()) as walk:
+            async for entry in walk:
+                is_folder = "folder" in entry.item
+                if files_only and is_folder or folders_only and not is_folder:
+                    continue
+                if needle is not None and needle not in entry.item.get("name", "").lower():
+                    continue
+                entries.append({"path": entry.path, "depth": entry.depth, "item": entry.item})
+                if max_items is not None and len(entries) == max_items:
+                    truncated = walker.has_more
+                    break
+
+        logger.info(f"Walked {walker.folders_listed} folders, {len(entries)} matching items")
+        return ("Tree:", {
+            "value": entries,
+            "folders_listed": walker.folders_listed,
+            "errors": walker.errors,
+            "truncated": truncated
+        })
+    except GraphError as e:
+        logger.error(f"Error walking folder tree: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception while walking folder tree: {e}")
+        return ("Error:", str(e))
+
+
+class TopN:
+    """
+    Keep the n largest entries seen so far in a min-heap (memory stays O(n)).
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self._heap: List[Tuple[int, int, Dict[str, Any]]] = []
+        self._count = 0
+
+    def add(self, size: int, entry: Dict[str, Any]) -> None:
+        if self.n <= 0:
+            return
+        self._count += 1
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, (size, self._count, entry))
+        elif size > self._heap[0][0]:
+            heapq.heapreplace(self._heap, (size, self._count, entry))
+
+    def largest(self) -> List[Dict[str, Any]]:
+        return [entry for _, _, entry in sorted(self._heap, key=lambda pair: (-pair[0], pair[1]))]
+
+
+def _extension(name: str) -> str:
+    base, dot, ext = name.rpartition(".")
+    return f".{ext.lower()}" if dot and base else "(none)"
+
+
+async def onedrive_folder_stats(
+        folder_id: Optional[str] = None,
+        path: Optional[str] = None,
+        max_depth: Optional[int] = None,
+        top_n: int = 10,
+        max_concurrency: Optional[int] = None
+) -> Union[Tuple[str, Dict[str, Any]], Tuple[str, int, str]]:
+    """
+    Summarize what is stored under a folder: counts, bytes, file types and the largest items.
+
+    The total size comes from the folder's size facet, which Graph keeps as
+    the sum of everything below it. Counts, the per-extension histogram and
+    the largest files and folders are computed in one pass over a
+    concurrent walk, keeping only the top entries in memory. Listings are
+    served from the drive mirror or metadata cache when warm.
+
+    Parameters:
+    - folder_id: ID of the folder (optional, default the drive root)
+    - path: Path of the folder, used when folder_id is not given (optional)
+    - max_depth: Deepest level to walk, 1 = direct children only (optional, default unlimited)
+    - top_n: How many of the largest files and folders to return (default 10)
+    - max_concurrency: Folder listings in flight at once (optional, default ONEDRIVE_WALK_CONCURRENCY)
+
+    Returns:
+    - On success: Tuple with status message and dictionary of statistics
+    - On failure: Tuple with error message and details
+    """
+    client = get_onedrive_client()
+    if not client:
+        logger.error("Could not get OneDrive client")
+        return ("Could not get OneDrive client",)
+
+    try:
+        if folder_id is None:
+            folder_id = await resolve_item_id(client, path) if path is not None else "root"
+        logger.info(f"Collecting folder statistics for {folder_id} (max_depth={max_depth})")
+
+        folder = await get_item_cached(client, folder_id, _STATS_SELECT)
+        if "folder" not in folder and "root" not in folder:
+            return (f"Item '{folder.get('name', folder_id)}' is not a folder.",)
+
+        walker = TreeWalker(client, folder_id, max_depth=max_depth, concurrency=max_concurrency,
+                            select=_STATS_SELECT)
+        files = folders = file_bytes = 0
+        types: Dict[str, Dict[str, int]] = {}
+        largest_files = TopN(top_n)
+        largest_folders = TopN(top_n)
+        async with contextlib.aclosing(walker.walk()) as walk:
+            async for entry in walk:
+                size = entry.item.get("size") or 0
+                summary = {"path": entry.path, "id": entry.item["id"], "size": size}
+                if "folder" in entry.item:
+                    folders += 1
+                    largest_folders.add(size, summary)
+                    continue
+                files += 1
+                file_bytes += size
+                largest_files.add(size, summary)
+                histogram = types.setdefault(_extension(entry.item.get("name", "")), {"count": 0, "bytes": 0})
+                histogram["count"] += 1
+                histogram["bytes"] += size
+
+        logger.info(f"Folder {folder_id}: {files} files, {folders} folders, {walker.folders_listed} listings")
+        return ("Folder stats:", {
+            "id": folder.get("id"),
+            "name": folder.get("name"),
+            "total_bytes": folder.get("size", file_bytes),
+            "files": files,
+            "folders": folders,
+            "file_bytes": file_bytes,
+            "complete": max_depth is None and not walker.errors,
+            "types": dict(sorted(types.items(), key=lambda pair: -pair[1]["bytes"])),
+            "largest_files": largest_files.largest(),
+            "largest_folders": largest_folders.largest(),
+            "folders_listed": walker.folders_listed,
+            "errors": walker.errors
+        })
+    except GraphError as e:
+        logger.error(f"Error collecting folder statistics: {e}")
+        return ("Error:", e.status_code, e.text)
+    except Exception as e:
+        logger.error(f"Exception while collecting folder statistics: {e}")
+        return ("Error:", str(e))
@@ -0,0 +1,341 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Callable, Tuple
+
+import httpx
+
+from .base import OneDriveClient, GraphError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Upload session fragments must be multiples of 320 KiB and smaller than 60 MiB
+FRAGMENT_UNIT = 320 * 1024
+MAX_FRAGMENT_SIZE = 60 * 1024 * 1024 - FRAGMENT_UNIT
+
+# Above this size uploads switch from a simple PUT to an upload session
+SIMPLE_UPLOAD_LIMIT = int(os.getenv("ONEDRIVE_SIMPLE_UPLOAD_LIMIT", str(4 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("ONEDRIVE_UPLOAD_CHUNK_SIZE", str(10 * FRAGMENT_UNIT)))
+UPLOAD_MAX_RESUMES = int(os.getenv("ONEDRIVE_UPLOAD_MAX_RESUMES", "5"))
+# Fragments read ahead of the one being sent
+UPLOAD_MAX_IN_FLIGHT = int(os.getenv("ONEDRIVE_UPLOAD_MAX_IN_FLIGHT", "4"))
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class BytesSource:
+    """
+    Upload source backed by in-memory bytes; fragments are sliced without copying the whole buffer.
+    """
+
+    def __init__(self, data: bytes):
+        self._view = memoryview(data)
+        self.size = len(data)
+
+    async def read(self, offset: int, length: int) -> bytes:
+        return bytes(self._view[offset:offset + length])
+
+    def close(self) -> None:
+        self._view.release()
+
+
+class FileSource:
+    """
+    Upload source backed by a local file.
+
+    Each fragment is read at its offset with os.pread in a worker thread,
+    which releases the GIL during the read, so large files are never fully
+    loaded and disk reads do not block the event loop.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Only used where os.pread is unavailable (Windows), to guard the shared file position
+        self._lock = threading.Lock()
+
+    def _read_at(self, offset: int, length: int) -> bytes:
+        if hasattr(os, "pread"):
+            return os.pread(self._file.fileno(), length, offset)
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    async def read(self, offset: int, length: int) -> bytes:
+        if offset >= self.size:
+            return b""
+        return await asyncio.to_thread(self._read_at, offset, length)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _FragmentReader:
+    """
+    Reads upload fragments ahead of the sender into a bounded queue.
+
+    If the server asks for a different offset (after a resume) the
+    read-ahead restarts from that offset.
+    """
+
+    def __init__(self, source, size: int, depth: int):
+        self.source = source
+        self.size = size
+        self.depth = depth
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _restart(self, offset: int) -> None:
+        await self.close()
+        self._queue = asyncio.Queue(maxsize=self.depth)
+        self._task = asyncio.create_task(self._fill(offset, self._queue))
+
+    async def _fill(self, offset: int, queue: asyncio.Queue) -> None:
+        try:
+            while offset < self.source.size:
+                length = min(self.size, self.source.size - offset)
+                read = asyncio.ensure_future(self.source.read(offset, length))
+                try:
+                    data = await asyncio.shield(read)
+                except asyncio.CancelledError:
+                    # A read in a worker thread cannot be interrupted; let it finish
+                    # before close() returns and the source's file can be closed
+                    await asyncio.gather(read, return_exceptions=True)
+                    raise
+                await queue.put((offset, data))
+                offset += length
+            # End marker, so a later get() for an earlier offset restarts instead of waiting
+            await queue.put((offset, None))
+        except Exception as e:
+            await queue.put((offset, e))
+
+    async def get(self, offset: int) -> bytes:
+        for _ in range(2):
+            if self._queue is None:
+                await self._restart(offset)
+            start, data = await self._queue.get()
+            if isinstance(data, Exception):
+                raise data
+            if start == offset and data is not None:
+                return data
+            self._queue = None
+        raise RuntimeError(f"Could not read upload fragment at byte {offset}")
+
+    async def close(self) -> None:
+        """
+        Stop reading ahead and wait until no read of the source is in progress.
+        """
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+def fragment_size(chunk_size: int) -> int:
+    """
+    Round a chunk size down to a valid upload session fragment size.
+    """
+    size = (chunk_size // FRAGMENT_UNIT) * FRAGMENT_UNIT
+    return max(FRAGMENT_UNIT, min(size, MAX_FRAGMENT_SIZE))
+
+
+def log_progress(name: str) -> ProgressCallback:
+    """
+    Return a progress callback that logs upload progress for a file.
+    """
+    def progress(uploaded: int, total: int) -> None:
+        percent = uploaded * 100 // total if total else 100
+        logger.info(f"Uploading '{name}': {uploaded}/{total} bytes ({percent}%)")
+    return progress
+
+
+async def create_upload_session(
+        client: OneDriveClient,
+        session_url: str,
+        conflict_behavior: Optional[str] = None
+) -> str:
+    """
+    Create an upload session and return its pre-authenticated upload URL.
+
+    Parameters:
+    - client: OneDrive client to send the request with
+    - session_url: Graph createUploadSession URL for the target item
+    - conflict_behavior: "fail", "rename" or "replace" (optional)
+    """
+    body = {}
+    if conflict_behavior:
+        body = {"item": {"@microsoft.graph.conflictBehavior": conflict_behavior}}
+
+    response = await client.post(session_url, json=body)
+    if not response.is_success:
+        raise GraphError(response.status_code, response.text)
+    return response.json()["uploadUrl"]
+
+
+def _next_offset(status: Dict[str, Any], default: int) -> int:
+    """
+    Read the first missing byte from an upload session status.
+    """
+    ranges = status.get("nextExpectedRanges") or []
+    if not ranges:
+        return default
+    return int(ranges[0].split("-")[0])
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return min(2 ** attempt, 30)
+
+
+async def _query_next_offset(client: OneDriveClient, upload_url: str) -> int:
+    response = await client.get(upload_url, authenticated=False)
+    if not response.is_success:
+        raise GraphError(response.status_code, response.text)
+    return _next_offset(response.json(), 0)
+
+
+async def upload_in_session(
+        client: OneDriveClient,
+        upload_url: str,
+        source,
+        chunk_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        progress: Optional[ProgressCallback] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Upload a source to an upload session fragment by fragment.
+
+    Graph requires the fragments of one session to arrive in order, so one
+    fragment is sent at a time while up to `max_in_flight` following
+    fragments are read ahead. After a dropped connection or a transient
+    server error the session status is queried and the upload resumes from
+    the server's nextExpectedRanges instead of starting over.
+
+    Parameters:
+    - client: OneDrive client to send the requests with
+    - upload_url: Pre-authenticated URL returned by create_upload_session()
+    - source: BytesSource or FileSource with the file content
+    - chunk_size: Fragment size, rounded to a multiple of 320 KiB
+    - max_in_flight: Fragments buffered ahead of the sender (default ONEDRIVE_UPLOAD_MAX_IN_FLIGHT)
+    - progress: Called with (uploaded_bytes, total_bytes) after each fragment
+
+    Returns:
+    - Tuple of the created or updated driveItem JSON and upload metrics
+    """
+    total = source.size
+    size = fragment_size(chunk_size or UPLOAD_CHUNK_SIZE)
+    reader = _FragmentReader(source, size, max(1, max_in_flight or UPLOAD_MAX_IN_FLIGHT))
+    metrics = {"bytes": total, "bytes_sent": 0, "fragments": 0, "resumes": 0}
+    started = time.monotonic()
+    offset = 0
+
+    try:
+        while True:
+            fragment = await reader.get(offset)
+            end = offset + len(fragment)
+            error = None
+            try:
+                response = await client.put(
+                    upload_url,
+                    authenticated=False,
+                    retry=False,
+                    headers={"Content-Range": f"bytes {offset}-{end - 1}/{total}"},
+                    content=fragment
+                )
+                metrics["bytes_sent"] += len(fragment)
+                metrics["fragments"] += 1
+                if response.status_code in (200, 201):
+                    if progress:
+                        progress(total, total)
+                    return response.json(), _finish_metrics(metrics, started)
+                if response.status_code == 202:
+                    offset = _next_offset(response.json(), end)
+                    if progress:
+                        progress(offset, total)
+                    continue
+                if response.status_code not in (416, 429) and response.status_code < 500:
+                    raise GraphError(response.status_code, response.text)
+                error = GraphError(response.status_code, response.text)
+                delay = _retry_delay(response, metrics["resumes"])
+            except httpx.TransportError as e:
+                error = e
+                delay = min(2 ** metrics["resumes"], 30)
+
+            metrics["resumes"] += 1
+            if metrics["resumes"] > UPLOAD_MAX_RESUMES:
+                raise error
+            logger.warning(f"Upload fragment at byte {offset} failed ({error}); resuming in {delay}s")
+            await asyncio.sleep(delay)
+            offset = await _query_next_offset(client, upload_url)
+    finally:
+        await reader.close()
+
+
+def _finish_metrics(metrics: Dict[str, Any], started: float) -> Dict[str, Any]:
+    elapsed = time.monotonic() - started
+    metrics["seconds"] = round(elapsed, 3)
+    metrics["bytes_per_second"] = int(metrics["bytes"] / elapsed) if elapsed > 0 else metrics["bytes"]
+    logger.info(
+        f"Uploaded {metrics['bytes']} bytes in {metrics['seconds']}s "
+        f"({metrics['bytes_per_second']} B/s, {metrics['fragments']} fragments, {metrics['resumes']} resumes)"
+    )
+    return metrics
+
+
+async def cancel_upload_session(client: OneDriveClient, upload_url: str) -> None:
+    """
+    Delete an unfinished upload session so its fragments are discarded.
+    """
+    try:
+        await client.delete(upload_url, authenticated=False)
+    except httpx.HTTPError as e:
+        logger.warning(f"Could not cancel upload session: {e}")
+
+
+async def upload_source(
+        client: OneDriveClient,
+        content_url: str,
+        session_url: str,
+        source,
+        conflict_behavior: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Upload file content, using an upload session above SIMPLE_UPLOAD_LIMIT.
+
+    Parameters:
+    - client: OneDrive client to send the requests with
+    - content_url: Graph .../content URL used for a simple PUT
+    - session_url: Graph .../createUploadSession URL used for large content
+    - source: BytesSource or FileSource with the file content
+    - conflict_behavior: "fail", "rename" or "replace" (optional)
+    - progress: Called with (uploaded_bytes, total_bytes) during session uploads
+
+    Returns:
+    - Tuple of the created or updated driveItem JSON and upload metrics
+
+    Raises:
+    - GraphError if Graph rejects the upload
+    """
+    if source.size <= SIMPLE_UPLOAD_LIMIT:
+        started = time.monotonic()
+        if conflict_behavior:
+            content_url = f"{content_url}?@microsoft.graph.conflictBehavior={conflict_behavior}"
+        response = await client.put(content_url, content=await source.read(0, source.size))
+        if not response.is_success:
+            raise GraphError(response.status_code, response.text)
+        metrics = {"bytes": source.size, "bytes_sent": source.size, "fragments": 1, "resumes": 0}
+        return response.json(), _finish_metrics(metrics, started)
+
+    logger.info(f"Uploading {source.size} bytes through an upload session")
+    upload_url = await create_upload_session(client, session_url, conflict_behavior)
+    try:
+        return await upload_in_session(client, upload_url, source, progress=progress)
+    except Exception:
+        await cancel_upload_session(client, upload_url)
+        raise